@@ -1,64 +1,307 @@
 
-import sys, os, sqlite3, openpyxl, openpyxl.styles, calendar
+import sys, os, calendar, time, sqlite3
+# Відлік часу до першого відображення вікна
+STARTED = time.perf_counter()
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
-    QLabel, QDialog, QLineEdit, QComboBox, QFrame, QFileDialog, QCheckBox, QMessageBox, QHeaderView, QAbstractItemView
+    QTableView, QLabel, QDialog, QLineEdit, QComboBox, QFrame, QFileDialog, QCheckBox, QMessageBox, QHeaderView,
+    QAbstractItemView, QProgressDialog, QDateEdit, QSpinBox, QInputDialog
+)
+from PyQt6.QtGui import QAction, QFont
+from PyQt6.QtCore import (
+    Qt, QTimer, QDate, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QThread, pyqtSignal,
+    QObject, QRunnable, QThreadPool
 )
-from PyQt6.QtGui import QAction
-from PyQt6.QtCore import Qt, QTimer
 from datetime import datetime, date
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font
-
-def init_db(db_name=None):
-    db_path = os.path.join(os.getcwd(), db_name)
-    conn = sqlite3.connect(db_path)
-    curs = conn.cursor()
-
-    curs.execute("""
-        CREATE TABLE IF NOT EXISTS people (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rank TEXT NOT NULL,
-            sec_name TEXT NOT NULL,
-            name TEXT NOT NULL,
-            unit TEXT NOT NULL,
-            note TEXT
-        )
-    """)
-
-    curs.execute("""
-        CREATE TABLE IF NOT EXISTS service_periods (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            person_id INTEGER NOT NULL,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL,
-            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE
-        )
-    """)
-
-    curs.execute("""
-        CREATE TABLE IF NOT EXISTS preferenced_periods (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            person_id INTEGER NOT NULL,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL,
-            preference_type TEXT NOT NULL,
-            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE       
-        )
-    """)
-
-    curs.execute("""
-        CREATE TABLE IF NOT EXISTS service_totals (
-            person_id INTEGER PRIMARY KEY,
-            calendar_years TEXT,
-            preferenced_years TEXT,
-            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE
-        )
-    """)
+from visluga_db import (
+    Database, Person, ConflictError, init_db, format_day, fill_periods, fill_person_periods, describe_conflict,
+    is_busy, RANKS, UNITS, PREF_TYPES
+)
+from visluga_client import RemoteDatabase, ServerError, connect, is_server_url
+from visluga_search import SearchIndex, FTS_MIN_PEOPLE, enable_fts, fts_search
+from visluga_export import (
+    HEADERS, CHANGE_HEADERS, count_people, iter_export_rows, iter_change_rows, export_to_csv, export_to_xlsx
+)
+from visluga_intervals import overlapping, union, audit, describe, merge
+# Помилки бази, після яких вікно працює далі: дію скасовано, користувач бачить попередження
+# (OperationalError - зокрема "database is locked", коли інша копія програми не відпустила базу й після повторів)
+DB_ERRORS = (ServerError, sqlite3.OperationalError)
+# Скільки вікно чекає на блокування бази іншою копією програми (мс) за одну спробу. Спроб разом із
+# повторами BUSY_RETRIES + 1, тож вікно чекає щонайбільше ~10 с: запис однієї дії триває мілісекунди,
+# і цього з запасом вистачає на чергу з кількох клерків на мережевому диску, а довше вікно "висіти" не повинно.
+# Змінюється змінною середовища VISLUGA_BUSY_TIMEOUT.
+GUI_BUSY_TIMEOUT_MS = int(os.environ.get("VISLUGA_BUSY_TIMEOUT", 2000))
+# Секунд на один запит перевірки змін від сервера (перевірка йде у потоці вікна)
+POLL_TIMEOUT = 2
+# numpy (visluga_engine), імпорт, пакетний звіт і прогноз ювілеїв потрібні не одразу -
+# вони імпортуються там, де вперше використовуються, щоб вікно з'являлося швидше
+
+def db_error_text(error):
+    if isinstance(error, sqlite3.OperationalError) and is_busy(error):
+        return "Базу зараз змінює інша копія програми. Зачекайте кілька секунд і повторіть дію."
+    return "Перевірте з'єднання з базою і повторіть дію."
+
+class PeopleTableModel(QAbstractTableModel):
+    # Клітинки віддаються на вимогу прямо з self.people (той самий список записів Person, що й MainProg.infos)
+    COLUMNS = [None, "rank", "sec_name", "name", "unit", "cal_SY", "pref_SY",
+               "cal_periods", "pref_periods", "civil_edu", "note"]
+
+    def __init__(self, headers, people, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.people = people
+        self.rows_by_id = None
+        # Режим "на дату": підсумки на вибрану дату замість сьогоднішніх (person_id -> (календарна, пільгова))
+        self.as_of_day = None
+        self.as_of_totals = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.people)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.cell_text(index.row(), index.column())
+        if role == Qt.ItemDataRole.UserRole:
+            if index.column() == 0:
+                return index.row()
+            return self.cell_text(index.row(), index.column())
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def cell_text(self, row, column):
+        if column == 0:
+            return str(row + 1)
+        if self.as_of_day is not None and column in (5, 6):
+            return self.as_of_totals.get(self.people[row].id, ("", ""))[column - 5]
+        value = getattr(self.people[row], self.COLUMNS[column]) or ""
+        return value.upper() if column == 2 else value
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation != Qt.Orientation.Horizontal:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if self.as_of_day is not None and section in (5, 6):
+                return f"{self.headers[section]}\nна {format_day(self.as_of_day)}"
+            return self.headers[section]
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.FontRole:
+            font = QFont()
+            font.setBold(True)
+            return font
+        return None
+
+    def set_people(self, people):
+        self.beginResetModel()
+        self.people = people
+        self.rows_by_id = None
+        self.endResetModel()
+
+    def append_person(self, info):
+        row = len(self.people)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.people.append(info)
+        if self.rows_by_id is not None:
+            self.rows_by_id[info.id] = row
+        self.endInsertRows()
+
+    def remove_rows(self, rows):
+        # Сусідні рядки видаляються одним сигналом, знизу догори, щоб номери вище не зсувалися
+        rows = sorted(rows, reverse=True)
+        last = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i] != rows[i - 1] - 1:
+                first_row, last_row = rows[i - 1], rows[last]
+                self.beginRemoveRows(QModelIndex(), first_row, last_row)
+                del self.people[first_row:last_row + 1]
+                self.endRemoveRows()
+                last = i
+        self.rows_by_id = None
+
+    def row_of(self, person_id):
+        if self.rows_by_id is None:
+            self.rows_by_id = {info.id: row for row, info in enumerate(self.people)}
+        return self.rows_by_id.get(person_id, -1)
+
+    def set_as_of(self, day, totals):
+        self.as_of_day = day
+        self.as_of_totals = totals
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 5, 6)
+        if self.people:
+            self.dataChanged.emit(self.index(0, 5), self.index(len(self.people) - 1, 6))
+
+    def people_changed(self, person_ids):
+        # Сусідні рядки об'єднуються в один сигнал dataChanged
+        rows = sorted(row for row in map(self.row_of, person_ids) if row >= 0)
+        last_column = len(self.headers) - 1
+        first = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i] != rows[i - 1] + 1:
+                self.dataChanged.emit(self.index(rows[first], 1), self.index(rows[i - 1], last_column))
+                first = i
+
+class PeopleFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.matching_ids = None
+        self.setSortRole(Qt.ItemDataRole.UserRole)
+
+    def set_matching_ids(self, matching_ids):
+        self.matching_ids = matching_ids
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.matching_ids is None:
+            return True
+        return self.sourceModel().people[source_row].id in self.matching_ids
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.column() == 0:
+            return str(index.row() + 1)
+        return super().data(index, role)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Стовпець "№" за зростанням - це порядок самої моделі, сортувати нічого не треба
+        if column == 0 and order == Qt.SortOrder.AscendingOrder:
+            column = -1
+        super().sort(column, order)
+
+    def lessThan(self, left, right):
+        if left.column() == 0:
+            return left.row() < right.row()
+        return super().lessThan(left, right)
+
+class ExportWorker(QThread):
+    # Окреме з'єднання з базою в робочому потоці: вікно не блокується на час експорту
+    progress = pyqtSignal(int)
+    exported = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_path, output_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.output_path = output_path
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        # Виняток, що вийшов з QThread.run, зупиняє всю програму, тож і відкриття бази - всередині try
+        try:
+            db = Database(self.db_path, busy_timeout=GUI_BUSY_TIMEOUT_MS)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        try:
+            done = export_to_xlsx(
+                self.output_path, iter_export_rows(db.conn), self.progress.emit, lambda: self.cancelled
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        finally:
+            db.close()
+        if done:
+            self.exported.emit(self.output_path)
+
+class BatchWorker(QThread):
+    # Перерахунок каталогу баз у пулі процесів; потік лише чекає на процеси і пише звіт
+    progress = pyqtSignal(int)
+    done = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, paths, output_path, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.output_path = output_path
+
+    def run(self):
+        from visluga_batch import batch_recompute, report_format, write_report
 
-    conn.commit()
-    conn.close()
-    print("Базу даних ініціалізовано.")
+        try:
+            results = batch_recompute(self.paths, fmt=report_format(self.output_path), progress=self.progress.emit)
+            write_report(self.output_path, results)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.done.emit([(result["file"], result["people"], result["error"]) for result in results])
+
+class LoadSignals(QObject):
+    # Перший аргумент кожного сигналу - номер завантаження; результати старих завантажень відкидаються
+    people_loaded = pyqtSignal(int, list)
+    index_loaded = pyqtSignal(int, object, bool)
+    chunk_loaded = pyqtSignal(int, list)
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(int, str)
+
+class LoadWorker(QRunnable):
+    # Спершу віддає людей (таблиця вже придатна до роботи), потім частинами - періоди й вислугу
+    CHUNK = 5000
+
+    def __init__(self, db_path, token, signals):
+        super().__init__()
+        self.db_path = db_path
+        self.token = token
+        self.signals = signals
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            db = connect(self.db_path, GUI_BUSY_TIMEOUT_MS)
+        except Exception as e:
+            self.signals.failed.emit(self.token, str(e))
+            return
+        # Скасоване завантаження (відкрито іншу базу) перевіряється після кожного етапу, щоб потік пулу
+        # швидко звільнився для нового
+        try:
+            people = db.load_people()
+            from visluga_engine import totals_with_cache
+            if self.cancelled:
+                return
+            self.signals.people_loaded.emit(self.token, people)
+
+            search_index = SearchIndex()
+            search_index.build(people)
+            use_fts = db.conn is not None and len(people) >= FTS_MIN_PEOPLE and enable_fts(db.conn)
+            if self.cancelled:
+                return
+            self.signals.index_loaded.emit(self.token, search_index, use_fts)
+
+            cal_periods = db.load_service_periods()
+            pref_periods = db.load_preference_periods()
+            # Дійсні підсумки беруться з service_totals, перераховуються лише застарілі
+            cached = db.load_totals()
+            person_ids = [info.id for info in people]
+            for first in range(0, len(person_ids), self.CHUNK):
+                if self.cancelled:
+                    return
+                chunk_ids = person_ids[first:first + self.CHUNK]
+                totals, stale_rows = totals_with_cache(chunk_ids, cal_periods, pref_periods, cached)
+                updates = [
+                    (person_id, tuple(cal_periods.get(person_id, ())), tuple(pref_periods.get(person_id, ())),
+                     cal_years, pref_years)
+                    for person_id, (cal_years, pref_years) in zip(chunk_ids, totals)
+                ]
+                if stale_rows:
+                    db.save_totals(stale_rows)
+                self.signals.chunk_loaded.emit(self.token, updates)
+        except Exception as e:
+            self.signals.failed.emit(self.token, str(e))
+            return
+        finally:
+            db.close()
+        self.signals.finished.emit(self.token)
 
 class MainProg(QMainWindow):
     def __init__(self):
@@ -68,6 +311,9 @@ class MainProg(QMainWindow):
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.current_db = None
+        self.db = None
+        self.people_by_id = {}
+        self.dirty_ids = set()
 
         menu_bar = self.menuBar()
         file_menu = menu_bar.addMenu("Файл")
@@ -81,10 +327,34 @@ class MainProg(QMainWindow):
         open_db_action.triggered.connect(self.open_existing_database)
         file_menu.addAction(open_db_action)
 
+        connect_server_action = QAction("Підключитися до сервера", self)
+        connect_server_action.triggered.connect(self.connect_to_server)
+        file_menu.addAction(connect_server_action)
+
         export_to_excel_action = QAction("Експортувати у Excel", self)
         export_to_excel_action.triggered.connect(self.export_to_excel)
         file_menu.addAction(export_to_excel_action)
 
+        export_changes_action = QAction("Експортувати зміни", self)
+        export_changes_action.triggered.connect(self.export_changes)
+        file_menu.addAction(export_changes_action)
+
+        import_action = QAction("Імпортувати з Excel/CSV", self)
+        import_action.triggered.connect(self.import_from_file)
+        file_menu.addAction(import_action)
+
+        audit_action = QAction("Перевірити перетини періодів", self)
+        audit_action.triggered.connect(self.audit_overlaps)
+        file_menu.addAction(audit_action)
+
+        batch_action = QAction("Зведений звіт по каталогу баз", self)
+        batch_action.triggered.connect(self.batch_report)
+        file_menu.addAction(batch_action)
+
+        milestones_action = QAction("Найближчі ювілеї вислуги", self)
+        milestones_action.triggered.connect(self.show_milestones)
+        file_menu.addAction(milestones_action)
+
         exit_action = QAction("Вийти", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -98,7 +368,45 @@ class MainProg(QMainWindow):
 
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Пошук...")
-        self.search_input.textChanged.connect(self.filter_infos)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.filter_infos)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_index = SearchIndex()
+        self.search_ready = True
+        self.use_fts = False
+        self.export_worker = None
+        self.batch_worker = None
+        # Прогноз ювілейних дат будується при першому відкритті і далі оновлюється лише для змінених людей
+        self.milestones = None
+        # Періоди всіх людей у масивах TotalsIndex для режиму "на дату": зміна дати лише перераховує підсумки,
+        # а з бази періоди читаються знову тільки після завантаження чи зміни періодів
+        self.as_of_index = None
+        self.as_of_ids = []
+
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.load_signals = LoadSignals(self)
+        self.load_signals.people_loaded.connect(self.on_people_loaded)
+        self.load_signals.index_loaded.connect(self.on_index_loaded)
+        self.load_signals.chunk_loaded.connect(self.on_periods_loaded)
+        self.load_signals.finished.connect(self.on_load_finished)
+        self.load_signals.failed.connect(self.on_load_failed)
+        self.load_worker = None
+        self.load_token = 0
+        self.loaded_count = 0
+        # Люди, змінені вручну під час фонового завантаження: до індексу пошуку з потоку вони додаються заново,
+        # а застарілі періоди й вислуга з потоку не застосовуються лише тим, кого вже перераховано (mark_dirty)
+        self.reindexed_while_loading = set()
+        self.changed_while_loading = set()
+        # Робота через сервер: зміни інших діловодів підтягуються з журналу змін
+        self.seen_change = 0
+        # Окреме з'єднання з коротким тайм-аутом: повільний сервер не повинен надовго зупиняти вікно
+        self.poll_db = None
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(3000)
+        self.poll_timer.timeout.connect(self.poll_changes)
         
         butt_size = 150
 
@@ -125,9 +433,25 @@ class MainProg(QMainWindow):
         self.del_people_button = QPushButton("Видалити")
         self.del_people_button.setFixedWidth(butt_size)
         self.del_people_button.clicked.connect(self.del_selected_people)
+
+        self.as_of_checkbox = QCheckBox("Вислуга на дату")
+        self.as_of_checkbox.toggled.connect(self.update_as_of)
+        self.as_of_date = QDateEdit(QDate.currentDate())
+        self.as_of_date.setDisplayFormat("dd.MM.yyyy")
+        self.as_of_date.setCalendarPopup(True)
+        self.as_of_date.setEnabled(False)
+        self.as_of_checkbox.toggled.connect(self.as_of_date.setEnabled)
+        # Прокручування дати колесом миші дає десятки змін поспіль - підсумки рахуються лише для останньої
+        self.as_of_timer = QTimer(self)
+        self.as_of_timer.setSingleShot(True)
+        self.as_of_timer.setInterval(250)
+        self.as_of_timer.timeout.connect(self.update_as_of)
+        self.as_of_date.dateChanged.connect(self.as_of_timer.start)
                         
         top_main_layout = QHBoxLayout()
         top_main_layout.addWidget(self.search_input)
+        top_main_layout.addWidget(self.as_of_checkbox)
+        top_main_layout.addWidget(self.as_of_date)
         top_main_layout.addWidget(self.add_people_button)
         top_main_layout.addWidget(self.edit_people_button)        
         top_main_layout.addWidget(self.add_period_cal_button)
@@ -136,17 +460,21 @@ class MainProg(QMainWindow):
         top_main_layout.addWidget(self.del_people_button)
         self.main_layout.addLayout(top_main_layout)
 
-        self.headers = ["№", "Військове звання", "Прізвище", "Ім'я\nПо батькові", "Підрозділ",
-                        "Календарна вислуга років", "Пільгова вислуга років", "Періоди військової служби",
-                        "Пільгові періоди служби", "Навчання в цивільному ВНЗ", "Примітка"]
+        self.headers = HEADERS
 
-        self.table = QTableWidget()
+        self.infos = []
+
+        self.table_model = PeopleTableModel(self.headers, self.infos, self)
+        self.table_proxy = PeopleFilterProxy(self)
+        self.table_proxy.setSourceModel(self.table_model)
+
+        self.table = QTableView()
+        self.table.setModel(self.table_proxy)
         self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.SortOrder.AscendingOrder)
         self.table.setWordWrap(True)
-        self.table.resizeRowsToContents()
         self.table.verticalHeader().setVisible(False)
-        self.table.setColumnCount(len(self.headers))
-        self.table.setHorizontalHeaderLabels(self.headers)
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
         self.table.horizontalHeader().setStyleSheet("""
             QHeaderView:section {
                 background: white;
@@ -160,45 +488,55 @@ class MainProg(QMainWindow):
             }
         """)
 
-        for col in range(self.table.columnCount()):
-            header_item = self.table.horizontalHeaderItem(col)
-            if header_item:
-                header_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                font = header_item.font()
-                font.setBold(True)
-                header_item.setFont(font)
-
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        # Кілька людей (Ctrl/Shift) - для спільного додавання періодів і видалення
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.main_layout.addWidget(self.table)
-                
-        self.infos = []
 
-        last_db_path = os.path.join(os.getcwd(), "last_db.txt")
-        if os.path.exists(last_db_path):
-            with open(last_db_path, "r", encoding="utf-8") as f:
-                self.current_db = f.read().strip()
-            if os.path.exists(self.current_db):
-                self.load_people_from_db()
-                self.load_service_periods()
-                self.load_preference_periods()
-                self.calculate_totals()
-                self.update_table()
+        # Висоту рядків рахуємо лише для видимої частини таблиці, а не для всіх людей
+        self.resize_rows_timer = QTimer(self)
+        self.resize_rows_timer.setSingleShot(True)
+        self.resize_rows_timer.timeout.connect(self.resize_visible_rows)
+        self.table.verticalScrollBar().valueChanged.connect(self.resize_rows_timer.start)
+        self.table_proxy.layoutChanged.connect(self.resize_rows_timer.start)
+        self.table_proxy.modelReset.connect(self.resize_rows_timer.start)
+        self.table_proxy.rowsInserted.connect(self.resize_rows_timer.start)
+        self.table_proxy.dataChanged.connect(self.resize_rows_timer.start)
+
+        # Остання база відкривається лише після першого відображення вікна (див. paintEvent)
+        self.first_paint = None
 
         QTimer.singleShot(100, self.show_welcome_message)
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint is None:
+            self.first_paint = time.perf_counter() - STARTED
+            QTimer.singleShot(0, self.restore_last_db)
+
+    def restore_last_db(self):
+        last_db_path = os.path.join(os.getcwd(), "last_db.txt")
+        if self.db is not None or not os.path.exists(last_db_path):
+            return
+        with open(last_db_path, "r", encoding="utf-8") as f:
+            last_db = f.read().strip()
+        if is_server_url(last_db) or os.path.exists(last_db):
+            try:
+                self.open_database(last_db)
+            except Exception as e:
+                QMessageBox.warning(self, "Помилка", f"Не вдалося відкрити {last_db}:\n{e}")
+                return
+            self.start_loading()
+
     def create_new_database(self):
         dialog = CreateDatabaseDialog(self)
         if dialog.exec():
             db_name = dialog.get_database_name()
             if db_name:
-                self.current_db = db_name
-                init_db(self.current_db)
-                self.load_people_from_db()
-                self.load_service_periods()
-                self.load_preference_periods()
-                self.calculate_totals()
+                init_db(db_name)
+                self.open_database(db_name)
+                self.start_loading()
                 with open("last_db.txt", "w", encoding="utf-8") as f:
                     f.write(self.current_db)
                 QMessageBox.information(self, "Успіх", f"Базу даних '{db_name}' створено успішно")
@@ -211,15 +549,151 @@ class MainProg(QMainWindow):
         if file_dialog.exec():
             selected_file = file_dialog.selectedFiles()[0]
             if selected_file:
-                self.current_db = selected_file
-                self.load_people_from_db()
-                self.load_service_periods()
-                self.load_preference_periods()
-                self.calculate_totals()
+                try:
+                    self.open_database(selected_file)
+                except Exception as e:
+                    QMessageBox.warning(self, "Помилка", f"Не вдалося відкрити базу даних:\n{e}")
+                    return
+                self.start_loading()
                 with open("last_db.txt", "w", encoding="utf-8") as f:
                     f.write(self.current_db)
                 QMessageBox.information(self, "Успіх", f"Базу даних '{os.path.basename(selected_file)}' успішно відкрито")
 
+    def connect_to_server(self):
+        url, ok = QInputDialog.getText(
+            self, "Підключитися до сервера", "Адреса сервера бази (visluga_server.py):", text="http://127.0.0.1:8765"
+        )
+        url = url.strip()
+        if not ok or not url:
+            return
+        if not is_server_url(url):
+            url = "http://" + url
+        try:
+            self.open_database(url)
+        except Exception as e:
+            QMessageBox.warning(self, "Помилка", f"Не вдалося підключитися до сервера:\n{e}")
+            return
+        self.start_loading()
+        with open("last_db.txt", "w", encoding="utf-8") as f:
+            f.write(self.current_db)
+
+    def open_database(self, path):
+        self.stop_loading()
+        self.stop_polling()
+        db = connect(path, GUI_BUSY_TIMEOUT_MS)
+        if self.db is not None:
+            self.db.close()
+        self.db = db
+        self.current_db = path
+        self.dirty_ids.clear()
+        if db.conn is None:
+            self.seen_change = db.last_change()
+            self.poll_db = RemoteDatabase(path, timeout=POLL_TIMEOUT)
+            self.poll_timer.start()
+
+    def stop_polling(self):
+        self.poll_timer.stop()
+        if self.poll_db is not None:
+            self.poll_db.close()
+            self.poll_db = None
+
+    def require_local_db(self):
+        if self.db is None:
+            return False
+        if self.db.conn is None:
+            QMessageBox.information(
+                self, "Робота через сервер",
+                "Ця дія доступна лише при роботі з файлом бази. Виконайте її на комп'ютері з сервером "
+                "(python visluga_cli.py <база.db> ...) або відкрийте файл бази."
+            )
+            return False
+        return True
+
+    def poll_changes(self):
+        # Не під час завантаження і не поки відкрито діалог: інакше змінився б рядок, з яким працює користувач
+        if self.poll_db is None or self.load_worker is not None or QApplication.activeModalWidget() is not None:
+            return
+        try:
+            changes = self.poll_db.changes_since(self.seen_change)
+            people = self.poll_db.people_by_ids(changes["changed"]) if changes["changed"] else []
+        except Exception as e:
+            self.statusBar().showMessage(str(e), 5000)
+            return
+        self.seen_change = changes["seq"]
+        self.apply_people_changes(people, changes["deleted"])
+
+    def apply_people_changes(self, people, deleted):
+        # Свіжі записи людей з бази (зміни інших користувачів): оновлюються, додаються або прибираються з таблиці
+        rows = [self.table_model.row_of(person_id) for person_id in deleted]
+        rows = [row for row in rows if row >= 0]
+        if rows:
+            self.table_model.remove_rows(rows)
+        for person_id in deleted:
+            self.people_by_id.pop(person_id, None)
+            self.search_index.remove(person_id)
+
+        for person in people:
+            info = self.people_by_id.get(person.id)
+            if info is None:
+                self.table_model.append_person(person)
+                self.people_by_id[person.id] = person
+                info = person
+            else:
+                info.update({
+                    key: getattr(person, key) for key in ("rank", "sec_name", "name", "unit", "note", "row_version")
+                })
+            self.search_index.add(info)
+
+        if people or deleted:
+            self.mark_dirty(*(person.id for person in people), *deleted)
+            self.recompute_dirty()
+            if self.search_input.text():
+                self.filter_infos()
+
+    def report_db_error(self, error):
+        QMessageBox.warning(
+            self,
+            "Помилка бази даних",
+            f"Дію не виконано:\n{error}\n\n{db_error_text(error)}"
+        )
+
+    def report_conflict(self, error, person_ids):
+        # Чужі зміни не перезаписуються: зміну скасовано, а люди, яких вона стосувалася, оновлюються з бази
+        person_ids = set(person_ids)
+        person_ids.update(conflict["id"] for conflict in error.conflicts if conflict["table"] == "people")
+        try:
+            people = self.db.people_by_ids(person_ids)
+        except Exception as e:
+            people = []
+            self.statusBar().showMessage(str(e), 5000)
+        else:
+            self.apply_people_changes(people, list(person_ids - {person.id for person in people}))
+
+        lines = [describe_conflict(conflict) for conflict in error.conflicts[:20]]
+        more = f"\n... та ще {len(error.conflicts) - 20}" if len(error.conflicts) > 20 else ""
+        QMessageBox.warning(
+            self,
+            "Конфлікт змін",
+            "Зміни не збережено: поки ви їх вносили, ці записи змінив інший користувач.\n\n"
+            + "\n".join(lines) + more
+            + "\n\nДані оновлено з бази. Перевірте їх і за потреби повторіть зміну."
+        )
+
+    def closeEvent(self, event):
+        self.stop_loading()
+        # Сигнали завантаження належать вікну, тож перед закриттям скасований потік має завершитися
+        self.thread_pool.waitForDone()
+        self.stop_polling()
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        if self.batch_worker is not None:
+            self.batch_worker.wait()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+        super().closeEvent(event)
+
     def open_add_people_dialog(self):
         dialog = AddPeople(self, info = {"rank": "", "sec_name": "", "name": "", "unit": "", "note": ""})
         if dialog.exec():
@@ -227,169 +701,318 @@ class MainProg(QMainWindow):
             self.add_people(info_data_people)
 
     def open_add_period_cal_dialog(self):
-        selected = self.table.currentRow()
+        rows = self.selected_rows()
+        if len(rows) > 1:
+            dialog = AddPeriod_Calendar(self, self.selection_label(rows))
+            if dialog.exec():
+                period = dialog.get_info_data_period_cal()
+                self.add_period_cal_bulk([self.infos[row].id for row in rows], period["start_day"], period["end_day"])
+            return
+
+        selected = self.selected_row()
         if selected < 0 or selected >= len(self.infos):
             return
         
-        person_id = self.infos[selected]["id"]
+        person_id = self.infos[selected].id
         person_data = self.infos[selected]
-        dialog = AddPeriod_Calendar(self, person_data, person_id=person_id,)
+        try:
+            existing = self.db.person_service_period_rows(person_id)
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
+        dialog = AddPeriod_Calendar(self, person_data, person_id=person_id, existing=existing)
         if dialog.exec():
             info_data_period_cal = dialog.get_info_data_period_cal()
+            info_data_period_cal["merge"] = dialog.merge_periods
             self.add_period_cal(info_data_period_cal)
     
     def open_edit_periods_dialog(self):
-        selected = self.table.currentRow()
+        selected = self.selected_row()
         if selected < 0 or selected >= len(self.infos):
             return
         
         person_data = self.infos[selected]
-        dialog = EditPeriodsDialog(self, person_data, self.current_db)
+        try:
+            dialog = EditPeriodsDialog(self, person_data, self.db)
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
         dialog.exec()
-        self.load_service_periods()
-        self.load_preference_periods()
-        self.calculate_totals()
-        self.update_table()
+        if dialog.conflict is not None:
+            self.report_conflict(dialog.conflict, [person_data.id])
+        elif dialog.changed:
+            self.mark_dirty(person_data.id)
+            self.recompute_dirty()
 
     def add_period_cal(self, period_data):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
-        curs.execute("""
-            INSERT INTO service_periods (person_id, start_date, end_date)
-            VALUES (?, ?, ?)
-        """, (
-            period_data["person_id"],
-            period_data["start_date"],
-            period_data["end_date"]
-        ))
-        conn.commit()
-        conn.close()
-        self.load_service_periods()
-        self.update_table()
-        self.calculate_totals()
+        person_id = period_data["person_id"]
+        start, end = period_data["start_day"], period_data["end_day"]
+        try:
+            with self.db.transaction():
+                # Об'єднання: періоди, що перетинаються з новим, замінюються одним спільним
+                merged = period_data.get("merge") or []
+                self.db.delete_service_periods((period[0], period[-1]) for period in merged)
+                if merged:
+                    start, end = union([period[1:3] for period in merged] + [(start, end)])
+                self.db.add_service_period(person_id, start, end)
+        except ConflictError as e:
+            self.report_conflict(e, [person_id])
+            return
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
+        self.mark_dirty(period_data["person_id"])
+        self.recompute_dirty()
 
     def open_add_period_pref_dialog(self):
-        selected = self.table.currentRow()
+        rows = self.selected_rows()
+        if len(rows) > 1:
+            dialog = AddPeriod_Pref(self, self.selection_label(rows))
+            if dialog.exec():
+                period = dialog.get_info_data_period_pref()
+                self.add_period_pref_bulk(
+                    [self.infos[row].id for row in rows], period["start_day"], period["end_day"],
+                    period["preference_type"]
+                )
+            return
+
+        selected = self.selected_row()
         if selected < 0 or selected >= len(self.infos):
             return
             
-        person_id = self.infos[selected]["id"]
+        person_id = self.infos[selected].id
         person_data = self.infos[selected]
-        dialog = AddPeriod_Pref(self, person_data, person_id=person_id)
+        try:
+            existing = self.db.person_preference_period_rows(person_id)
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
+        dialog = AddPeriod_Pref(self, person_data, person_id=person_id, existing=existing)
         if dialog.exec():
             info_data_period_pref = dialog.get_info_data_period_pref()
+            info_data_period_pref["merge"] = dialog.merge_periods
             self.add_period_pref(info_data_period_pref)
        
     def add_period_pref(self, period_data):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
-        curs.execute("""
-            INSERT INTO preferenced_periods (person_id, start_date, end_date, preference_type)
-            VALUES (?, ?, ?, ?)
-        """, (
-            period_data["person_id"],
-            period_data["start_date"],
-            period_data["end_date"],
-            period_data["preference_type"]
-        ))
-        conn.commit()
-        conn.close()
-        self.load_preference_periods()
-        self.update_table()
-        self.calculate_totals()
-
-    def add_people(self, info_data):
-        self.add_people_to_db(info_data)
-        self.infos.append(info_data)
-        self.update_table()
+        person_id = period_data["person_id"]
+        start, end = period_data["start_day"], period_data["end_day"]
+        try:
+            with self.db.transaction():
+                merged = period_data.get("merge") or []
+                self.db.delete_preference_periods((period[0], period[-1]) for period in merged)
+                if merged:
+                    start, end = union([period[1:3] for period in merged] + [(start, end)])
+                self.db.add_preference_period(person_id, start, end, period_data["preference_type"])
+        except ConflictError as e:
+            self.report_conflict(e, [person_id])
+            return
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
+        self.mark_dirty(period_data["person_id"])
+        self.recompute_dirty()
 
-    def add_people_to_db(self, info_data):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
+    def add_period_cal_bulk(self, person_ids, start, end):
+        # Той самий період кільком людям: одна транзакція і один перерахунок.
+        # Перетини з наявними періодами тут не перевіряються - для цього є "Перевірити перетини періодів".
+        try:
+            self.db.add_service_periods((person_id, start, end) for person_id in person_ids)
+        except ConflictError as e:
+            self.report_conflict(e, person_ids)
+            return
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
+        self.mark_dirty(*person_ids)
+        self.recompute_dirty()
 
-        curs.execute("""
-            INSERT INTO people (rank, sec_name, name, unit, note)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            info_data["rank"],
-            info_data["sec_name"],
-            info_data["name"],
-            info_data["unit"],
-            info_data["note"]
-        ))
+    def add_period_pref_bulk(self, person_ids, start, end, pref_type):
+        try:
+            self.db.add_preference_periods((person_id, start, end, pref_type) for person_id in person_ids)
+        except ConflictError as e:
+            self.report_conflict(e, person_ids)
+            return
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
+        self.mark_dirty(*person_ids)
+        self.recompute_dirty()
 
-        info_data["id"] = curs.lastrowid
+    def add_people(self, info_data):
+        person = Person(**info_data)
+        try:
+            self.add_people_to_db(person)
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
+        self.table_model.append_person(person)
+        self.people_by_id[person.id] = person
+        self.search_index.add(person)
+        if self.search_input.text():
+            self.filter_infos()
+        self.mark_dirty(person.id)
+        self.recompute_dirty()
 
-        conn.commit()
-        conn.close()
+    def add_people_to_db(self, person):
+        person.id = self.db.add_person(person)
 
     def load_people_from_db(self):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
-
-        curs.execute("SELECT id, rank, sec_name, name, unit, note FROM people")
-        rows = curs.fetchall()
-
-        self.infos = [
-            {"id": row[0], "rank": row[1], "sec_name": row[2], "name": row[3], "unit": row[4], "note": row[5]}
-            for row in rows
-        ]
+        self.infos = self.db.load_people()
+        self.people_by_id = {info.id: info for info in self.infos}
+        self.search_index.build(self.infos)
+        self.use_fts = self.db.conn is not None and len(self.infos) >= FTS_MIN_PEOPLE and enable_fts(self.db.conn)
+        self.table_model.set_people(self.infos)
+        self.table.resizeColumnsToContents()
+        if self.search_input.text():
+            self.filter_infos()
 
-        conn.close()
-        self.update_table()
+    def load_periods(self):
+        fill_periods(self.infos, self.db.load_service_periods(), self.db.load_preference_periods())
+
+    def start_loading(self):
+        self.stop_loading()
+        self.load_token += 1
+        self.reindexed_while_loading.clear()
+        self.changed_while_loading.clear()
+        self.milestones = None
+        self.as_of_index = None
+        self.statusBar().showMessage("Завантаження бази...")
+        self.load_worker = LoadWorker(self.current_db, self.load_token, self.load_signals)
+        self.thread_pool.start(self.load_worker)
+
+    def stop_loading(self):
+        # Вікно не чекає на скасоване завантаження: воно закінчиться на найближчому етапі,
+        # а його сигнали з попереднім номером відкидаються
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+            self.load_worker = None
+            # Ще не розпочаті завантаження з черги пулу не потрібні зовсім
+            self.thread_pool.clear()
+
+    def on_people_loaded(self, token, people):
+        if token != self.load_token:
+            return
+        self.infos = people
+        self.people_by_id = {info.id: info for info in self.infos}
+        # Поки індекс пошуку будується у фоні, таблиця показує всіх
+        self.search_index = SearchIndex()
+        self.search_ready = False
+        self.use_fts = False
+        self.table_proxy.set_matching_ids(None)
+        self.table_model.set_people(self.infos)
+        self.table.resizeColumnsToContents()
+        self.loaded_count = 0
 
-    def load_service_periods(self):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
+    def on_index_loaded(self, token, search_index, use_fts):
+        if token != self.load_token:
+            return
+        for person_id in self.reindexed_while_loading:
+            if person_id in self.people_by_id:
+                search_index.add(self.people_by_id[person_id])
+            else:
+                search_index.remove(person_id)
+        self.search_index = search_index
+        self.search_ready = True
+        self.use_fts = use_fts
+        if self.search_input.text():
+            self.filter_infos()
+
+    def on_periods_loaded(self, token, updates):
+        if token != self.load_token:
+            return
+        changed = []
+        for person_id, cal, pref, cal_years, pref_years in updates:
+            info = self.people_by_id.get(person_id)
+            if info is not None and person_id not in self.changed_while_loading:
+                info.cal, info.pref, info.cal_SY, info.pref_SY = cal, pref, cal_years, pref_years
+                changed.append(person_id)
+        self.table_model.people_changed(changed)
+        self.loaded_count += len(updates)
+        self.statusBar().showMessage(f"Завантаження періодів: {self.loaded_count} з {len(self.infos)}")
+
+    def on_load_finished(self, token):
+        if token != self.load_token:
+            return
+        self.load_worker = None
+        self.reindexed_while_loading.clear()
+        self.changed_while_loading.clear()
+        if self.as_of_day() is not None:
+            self.update_as_of()
+        self.table.resizeColumnsToContents()
+        self.statusBar().showMessage(f"Завантажено людей: {len(self.infos)}", 5000)
 
-        for info in self.infos:
-            curs.execute("""
-                SELECT start_date, end_date FROM service_periods
-                WHERE person_id = (
-                    SELECT id FROM people
-                    WHERE rank=? AND sec_name=? AND name=? AND unit=? AND note=?         
-                )
-            """, (
-                info["rank"], info["sec_name"], info["name"], info["unit"], info["note"]
-            ))
-
-            periods = curs.fetchall()
-            formatted = [f"{self.format_date(p[0])} - {self.format_date(p[1])}" for p in periods]
-            info["cal_periods"] = "\n".join(formatted) if formatted else ""
-
-        conn.close()
-
-    def load_preference_periods(self):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
-
-        for info in self.infos:
-            curs.execute("""
-                SELECT start_date, end_date, preference_type FROM preferenced_periods
-                WHERE person_id = (
-                    SELECT id FROM people
-                    WHERE rank=? AND sec_name=? AND name=? AND unit=? AND note=?
-                )
-            """, (
-                info["rank"], info["sec_name"], info["name"], info["unit"], info["note"]
-            ))
+    def on_load_failed(self, token, error):
+        if token != self.load_token:
+            return
+        self.load_worker = None
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "Помилка завантаження", f"Не вдалося завантажити базу:\n{error}")
 
-            periods = curs.fetchall()
-            general = []
-            civil = []
+    def remember_change(self, *person_ids):
+        if self.load_worker is not None:
+            self.reindexed_while_loading.update(person_ids)
 
-            for start, end, pref_type in periods:
-                if pref_type.strip().lower() == "навчання у цивільному внз":
-                    formatted = f"{self.format_date(start)} - {self.format_date(end)}"
-                    civil.append(formatted)
-                else:
-                    formatted = f"{self.format_date(start)} - {self.format_date(end)} ({pref_type})"
-                    general.append(formatted)
+    def mark_dirty(self, *person_ids):
+        self.dirty_ids.update(person_ids)
+        self.remember_change(*person_ids)
+        if self.load_worker is not None:
+            self.changed_while_loading.update(person_ids)
 
-            info["pref_periods"] = "\n".join(general) if general else ""
-            info["civil_edu"] = "\n" .join(civil) if civil else ""
+    def recompute_dirty(self):
+        dirty = list(self.dirty_ids)
+        person_ids = [person_id for person_id in dirty if person_id in self.people_by_id]
+        self.dirty_ids.clear()
 
-        conn.close()
+        try:
+            cal_periods, pref_periods = self.db.periods_for(person_ids)
+        except DB_ERRORS as e:
+            # Люди лишаються позначеними і будуть перераховані при наступній успішній зміні
+            self.dirty_ids.update(dirty)
+            self.statusBar().showMessage(f"Вислугу не оновлено: {e}", 5000)
+            return
+        for person_id in person_ids:
+            fill_person_periods(self.people_by_id[person_id], cal_periods[person_id], pref_periods[person_id])
+
+        self.as_of_index = None
+        day = self.as_of_day()
+        if day is not None:
+            from visluga_engine import TotalsIndex
+            as_of = TotalsIndex.for_people(person_ids, cal_periods, pref_periods).formatted(day, clip=True)
+            self.table_model.as_of_totals.update(zip(person_ids, as_of))
+        if self.milestones is not None:
+            # Видалені люди теж передаються: без періодів їхні записи просто зникнуть
+            self.milestones.update(dirty, cal_periods, pref_periods)
+        try:
+            self.calculate_totals(person_ids, cal_periods, pref_periods)
+        except DB_ERRORS as e:
+            # Зміна людини вже збережена, не записано лише підсумки - їх запише наступний перерахунок
+            self.dirty_ids.update(dirty)
+            self.statusBar().showMessage(f"Вислугу не збережено в базі: {e}", 5000)
+
+    def as_of_day(self):
+        if not self.as_of_checkbox.isChecked():
+            return None
+        selected = self.as_of_date.date()
+        return date(selected.year(), selected.month(), selected.day()).toordinal()
+
+    def update_as_of(self):
+        day = self.as_of_day()
+        if day is None or self.db is None:
+            self.table_model.set_as_of(None, {})
+            return
+        if self.as_of_index is None:
+            from visluga_engine import TotalsIndex
+
+            person_ids = [info.id for info in self.infos]
+            try:
+                cal_periods, pref_periods = self.db.load_service_periods(), self.db.load_preference_periods()
+            except DB_ERRORS as e:
+                self.report_db_error(e)
+                return
+            self.as_of_index = TotalsIndex.for_people(person_ids, cal_periods, pref_periods)
+            self.as_of_ids = person_ids
+        totals = self.as_of_index.formatted(day, clip=True)
+        self.table_model.set_as_of(day, dict(zip(self.as_of_ids, totals)))
 
     def edit_people(self, info_id):
         person_data = self.infos[info_id]
@@ -397,130 +1020,70 @@ class MainProg(QMainWindow):
         if dialog.exec():
             new_data = dialog.get_info_data_people()
             
-            person_id = person_data["id"]
-            self.update_people_in_db(person_id, new_data)
-            
-            new_data["id"] = person_id
-            self.infos[info_id] = new_data
+            person_id = person_data.id
+            try:
+                self.update_people_in_db(person_id, new_data, person_data.row_version)
+            except ConflictError as e:
+                self.report_conflict(e, [person_id])
+                return
+            except DB_ERRORS as e:
+                self.report_db_error(e)
+                return
+            person_data.update(new_data)
+            person_data.row_version += 1
+            self.search_index.add(person_data)
+            self.remember_change(person_id)
+            self.table_model.people_changed([person_id])
+            if self.search_input.text():
+                self.filter_infos()
+
+    def update_people_in_db(self, person_id, new_data, version):
+        self.db.update_person(person_id, new_data, version)
 
-            self.load_service_periods()
-            self.load_preference_periods()
-            self.calculate_totals()
-            self.update_table()
+    def filter_infos(self):
+        if not self.search_ready:
+            return
+        text = self.search_input.text()
+        found = fts_search(self.db.conn, text) if self.use_fts else None
+        if found is None:
+            found = self.search_index.search(text)
+        self.table_proxy.set_matching_ids(found)
+
+    def update_table(self):
+        self.table_model.set_people(self.infos)
+        self.table.resizeColumnsToContents()
 
-    def update_people_in_db(self, person_id, new_data):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
-
-        curs.execute("""
-            UPDATE people
-            SET rank = ?, sec_name = ?, name = ?, unit = ?, note = ?
-            WHERE id = ?
-
-        """, (
-            new_data["rank"],
-            new_data["sec_name"],
-            new_data["name"],
-            new_data["unit"],
-            new_data["note"],
-            person_id
-        ))
-    
-        conn.commit()
-        conn.close()
+    def selected_row(self):
+        index = self.table.currentIndex()
+        if not index.isValid():
+            return -1
+        return self.table_proxy.mapToSource(index).row()
 
-    def filter_infos(self):
-        search_text = self.search_input.text().lower()
-        self.filtered_infos = [info for info in self.infos if search_text in info["sec_name"].lower() 
-                               or search_text in info["name"].lower()]
-        self.update_table(filtered=True)
+    def selected_rows(self):
+        rows = {self.table_proxy.mapToSource(index).row() for index in self.table.selectionModel().selectedRows()}
+        return sorted(row for row in rows if row < len(self.infos))
 
-    def update_table(self, filtered=False):
-        infos_to_display = self.filtered_infos if filtered else self.infos
-        self.table.setRowCount(len(infos_to_display))
+    def selection_label(self, rows):
+        # Замість звання й імені у діалогах періодів, коли вибрано кількох людей
+        return {"rank": "", "sec_name": f"Вибрано людей: {len(rows)}", "name": ""}
 
-        for row_idx, info in enumerate(infos_to_display):
-            
-            item = QTableWidgetItem(str(row_idx + 1))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 0, item)
-            
-            item = QTableWidgetItem(info.get("rank", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 1, item)
-            
-            item = QTableWidgetItem(info.get("sec_name", "").upper())
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 2, item)
-            
-            item = QTableWidgetItem(info.get("name", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 3, item)
-            
-            item = QTableWidgetItem(info.get("unit", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 4, item)
-            
-            item = QTableWidgetItem(info.get("cal_SY", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 5, item)
-            
-            item = QTableWidgetItem(info.get("pref_SY", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 6, item)
-            
-            item = QTableWidgetItem(info.get("cal_periods", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 7, item)
-            
-            item = QTableWidgetItem(info.get("pref_periods", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 8, item)
-            
-            item = QTableWidgetItem(info.get("civil_edu", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 9, item)
-            
-            item = QTableWidgetItem(info.get("note", ""))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(row_idx, 10, item)
-        
-        self.table.resizeColumnsToContents()
-        self.table.resizeRowsToContents()
-        
-    def export_database_to_excel(self, output_path):
-    
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Вислуга років"
+    def resize_visible_rows(self):
+        first = self.table.rowAt(0)
+        if first < 0:
+            return
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if last < 0:
+            last = self.table_proxy.rowCount() - 1
+        for row in range(first, last + 1):
+            self.table.resizeRowToContents(row)
 
-        headers = ["№", "Військове звання", "Прізвище", "Ім'я\nПо батькові", "Підрозділ",
-                    "Календарна вислуга років", "Пільгова вислуга років", "Періоди військової служби",
-                    "Пільгові періоди служби", "Навчання в цивільному ВНЗ", "Примітка"]
-    
-        ws.append(headers)
-
-        for index, person in enumerate(self.infos):
-            ws.append([
-                str(index + 1),
-                person.get("rank", ""),
-                person.get("sec_name", ""),
-                person.get("name", ""),
-                person.get("unit", ""),
-                person.get("cal_SY", ""),
-                person.get("pref_SY", ""),
-                person.get("cal_periods", ""),
-                person.get("pref_periods", ""),
-                person.get("civil_edu", ""),
-                person.get("note", "")
-            ])
-
-        for cell in ws[1]:
-            cell.font = openpyxl.styles.Font(bold=True)
-
-        wb.save(output_path)
+    def export_database_to_excel(self, output_path):
+        export_to_xlsx(output_path, iter_export_rows(self.db.conn))
 
     def export_to_excel(self):
+        if not self.require_local_db() or self.export_worker is not None:
+            return
+
         path, _= QFileDialog.getSaveFileName(
             self,
             "Зберегти Excel-файл",
@@ -528,200 +1091,287 @@ class MainProg(QMainWindow):
             "excel файли (*.xlsx)"
         )
         if path:
-            self.export_database_to_excel(path)
-
-            QMessageBox.information(
-                self,
-                "Експортування завершено",
-                f"Базу успішно експортовано у файл:\n{path}"
-            )
-
-    def edit_selected_people(self):
-        selected = self.table.currentRow()
-        if selected >= 0 and selected < len(self.infos):
-            self.edit_people(selected)
-
-    def show_about(self):
-        about = AboutDialog(self)
-        about.exec()
+            progress = QProgressDialog("Експортування бази у Excel...", "Скасувати", 0, count_people(self.db.conn), self)
+            progress.setWindowTitle("Експортування")
+            progress.setWindowModality(Qt.WindowModality.WindowModal)
+            progress.setMinimumDuration(300)
+
+            self.export_worker = ExportWorker(self.current_db, path, self)
+            self.export_worker.progress.connect(progress.setValue)
+            progress.canceled.connect(self.export_worker.cancel)
+            self.export_worker.exported.connect(self.on_export_finished)
+            self.export_worker.failed.connect(self.on_export_failed)
+            self.export_worker.finished.connect(progress.close)
+            self.export_worker.finished.connect(self.on_export_worker_done)
+            self.export_worker.start()
+
+    def on_export_finished(self, path):
+        QMessageBox.information(
+            self,
+            "Експортування завершено",
+            f"Базу успішно експортовано у файл:\n{path}"
+        )
 
-    def del_selected_people(self):
-        selected = self.table.currentRow()
-        if selected < 0 or selected >= len(self.infos):
+    def export_changes(self):
+        # Лише люди, змінені після попереднього експорту змін; розмір файлу залежить від кількості правок
+        if not self.require_local_db():
+            return
+        last = self.db.last_change()
+        since, ok = QInputDialog.getInt(
+            self, "Експорт змін", f"Експортувати зміни після номера (останній номер: {last}):",
+            self.db.last_exported_change(), 0, last
+        )
+        if not ok:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Зберегти зміни",
+            f"Зміни вислуги {since + 1}-{last}.xlsx",
+            "excel файли (*.xlsx);;CSV (*.csv)"
+        )
+        if not path:
             return
 
-        msg = QMessageBox(self)
-        msg.setWindowTitle("Підтвердження видалення")
-        msg.setText("Ви справді хочете видалити цю особу?")
-        msg.setIcon(QMessageBox.Icon.Question)
-        msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        try:
+            rows = list(iter_change_rows(self.db.conn, since, last))
+            if path.lower().endswith(".csv"):
+                export_to_csv(path, rows, CHANGE_HEADERS)
+            else:
+                export_to_xlsx(path, rows, headers=CHANGE_HEADERS)
+            self.db.save_change_export(last, path)
+        except Exception as e:
+            self.on_export_failed(str(e))
+            return
+        QMessageBox.information(
+            self,
+            "Експортування завершено",
+            f"Змінених людей: {len(rows)} (зміни {since + 1}-{last}).\nФайл:\n{path}"
+        )
 
-        yes_button = msg.button(QMessageBox.StandardButton.Yes)
-        no_button = msg.button(QMessageBox.StandardButton.No)
-        yes_button.setText("Так")
-        no_button.setText("Ні")
+    def on_export_failed(self, error):
+        QMessageBox.warning(self, "Помилка експортування", f"Не вдалося експортувати базу:\n{error}")
 
-        msg.exec()
+    def on_export_worker_done(self):
+        self.export_worker.deleteLater()
+        self.export_worker = None
 
-        if msg.clickedButton() == yes_button:
-            person_id = self.infos[selected]["id"]
+    def import_from_file(self):
+        if not self.require_local_db():
+            return
 
-            conn = sqlite3.connect(self.current_db)
-            curs = conn.cursor()
-            curs.execute("DELETE FROM people WHERE id = ?", (person_id,))
-            conn.commit()
-            conn.close()
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Імпортувати людей і періоди",
+            "",
+            "Excel або CSV (*.xlsx *.csv)"
+        )
+        if not path:
+            return
 
-            del self.infos[selected]
-            self.update_table()
+        from visluga_import import ImportValidationError, import_file
 
-    def format_date(self, date_str):
-        if date_str == "NOW":
-            return "по т.ч."
         try:
-            return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-        except Exception:
-            return "???"
-    
-    def calculate_exact_period(self, start_date, end_date):
-        if end_date < start_date:
-            return "0 р. 0 м. 0 д."
-        
-        sy, sm, sd = start_date.year, start_date.month, start_date.day
-        ey, em, ed = end_date.year, end_date.month, end_date.day
-
-        years = ey - sy
-        months = em - sm
-        days = ed - sd
+            stats = import_file(self.db, path, recompute=False)
+        except ImportValidationError as e:
+            shown = "\n".join(e.errors[:20])
+            more = f"\n... та ще {len(e.errors) - 20}" if len(e.errors) > 20 else ""
+            QMessageBox.warning(self, "Помилка імпорту", f"Нічого не імпортовано.\n{shown}{more}")
+            return
+        except DB_ERRORS as e:
+            self.report_db_error(e)
+            return
 
-        if days < 0:
-            months -= 1
-            days += 30
+        self.start_loading()
+        QMessageBox.information(
+            self,
+            "Імпорт завершено",
+            f"Імпортовано людей: {stats['people']}, періодів: {stats['periods']}\n"
+            f"Швидкість: {stats['rows_per_second']:.0f} рядків/с"
+        )
 
-        if months < 0:
-            years -= 1
-            months += 12
+    def audit_overlaps(self):
+        if not self.require_local_db():
+            return
 
-        return f"{years} р. {months} м. {days} д."
+        overlaps = audit(self.db.conn)
+        if not overlaps:
+            QMessageBox.information(self, "Перетини періодів", "Періодів, що перетинаються, не знайдено.")
+            return
 
-    def date_diff(self, start, end):
-        sy, sm, sd = start.year, start.month, start.day
-        ey, em, ed = end.year, end.month, end.day
-        
-        years = ey - sy
-        months = em - sm
-        days = ed - sd
+        lines = []
+        for overlap in overlaps[:20]:
+            person = self.people_by_id.get(overlap["person_id"])
+            who = f"{person.sec_name.upper()} {person.name}" if person is not None else f"id {overlap['person_id']}"
+            lines.append(f"{who}. {describe(overlap)}")
+        more = f"\n... та ще {len(overlaps) - 20}" if len(overlaps) > 20 else ""
+        people = len({overlap["person_id"] for overlap in overlaps})
 
-        if days < 0:
-            months -= 1
-            days += 30
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Перетини періодів")
+        msg.setIcon(QMessageBox.Icon.Warning)
+        msg.setText(f"Знайдено груп періодів, що перетинаються: {len(overlaps)} (людей: {people}).\n\n"
+                    + "\n".join(lines) + more)
+        merge_button = msg.addButton("Об'єднати всі", QMessageBox.ButtonRole.AcceptRole)
+        msg.addButton("Закрити", QMessageBox.ButtonRole.RejectRole)
+        msg.exec()
 
-        if months < 0:
-            years -= 1
-            months += 12
+        if msg.clickedButton() == merge_button:
+            try:
+                self.mark_dirty(*merge(self.db, overlaps))
+            except ConflictError as e:
+                self.report_conflict(e, list({overlap["person_id"] for overlap in overlaps}))
+                return
+            except DB_ERRORS as e:
+                self.report_db_error(e)
+                return
+            self.recompute_dirty()
+
+    def show_milestones(self):
+        if self.db is None:
+            return
+        if self.load_worker is not None:
+            QMessageBox.information(self, "Ювілеї вислуги", "Зачекайте, база ще завантажується.")
+            return
+        if self.milestones is None or self.milestones.today != date.today().toordinal():
+            from visluga_forecast import MilestoneIndex
+            try:
+                cal_periods, pref_periods = self.db.load_service_periods(), self.db.load_preference_periods()
+            except DB_ERRORS as e:
+                self.report_db_error(e)
+                return
+            self.milestones = MilestoneIndex()
+            self.milestones.build([info.id for info in self.infos], cal_periods, pref_periods)
+        dialog = MilestonesDialog(self, self.milestones, self.people_by_id)
+        dialog.exec()
 
-        return years, months, days
-            
-    def normalize_ymd(self, y, m, d):
-        if d >= 30:
-            m += 1
-            d -= 30
-        if m >= 12:
-            y += 1
-            m -= 12
-        return y, m, d
-
-    def calculate_totals(self):
-        if not self.infos:
+    def batch_report(self):
+        if self.batch_worker is not None:
             return
-        
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
-
-        coeffs = {
-            "1 день/3 дні": 3.0,
-            "1 день/2 дні": 2.0,
-            "1 день/1,5 дні": 1.5,
-            "30 днів/40 днів": 1.33,
-            "Навчання у цивільному ВНЗ": 0.5
-        }
-        max_civil = (2, 6, 0)
 
-        for info in self.infos:
-            person_id = info["id"]
+        directory = QFileDialog.getExistingDirectory(self, "Каталог з базами підрозділів")
+        if not directory:
+            return
+        from visluga_batch import find_databases
+        paths = find_databases(directory)
+        if not paths:
+            QMessageBox.warning(self, "Зведений звіт", "У вибраному каталозі немає файлів .db")
+            return
 
-            cal_years = "0 р. 0 м. 0 д."
-            pref_years = "0 р. 0 м. 0 д."
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Зберегти зведений звіт",
+            "Зведений звіт вислуги.csv",
+            "CSV (*.csv);;excel файли (*.xlsx)"
+        )
+        if not path:
+            return
 
-            total_y, total_m, total_d = 0, 0, 0
-            curs.execute("SELECT start_date, end_date FROM service_periods WHERE person_id=?", (person_id,))
-            for s, e in curs.fetchall():
-                start = datetime.strptime(s, "%Y-%m-%d")
-                end = datetime.now() if e == "NOW" else datetime.strptime(e, "%Y-%m-%d")
-                
-                yc, mc, dc = self.date_diff(start, end)
-                total_y += yc
-                total_m += mc
-                total_d += dc
-
-            pref_y, pref_m, pref_d = 0, 0, 0
-            civil_y, civil_m, civil_d = 0, 0, 0
-            curs.execute("SELECT start_date, end_date, preference_type FROM preferenced_periods WHERE person_id=?", (person_id,))
-            for s, e, ptype in curs.fetchall():
-                start = datetime.strptime(s, "%Y-%m-%d")
-                end = datetime.now() if e == "NOW" else datetime.strptime(e, "%Y-%m-%d")
-                
-                y, m, d = self.date_diff(start, end)
-                coeff = coeffs.get(ptype, 1.0)
-
-                if coeff in [1.5, 1.33, 0.5]:
-                    total_days = y * 360 + m * 30 + d
-                    converted_days = int(total_days * coeff)
-                    py = converted_days // 360
-                    pm = (converted_days % 360) // 30
-                    pd = (converted_days % 360) % 30
-                else:
-                    py = int(y * coeff)
-                    pm = int(m * coeff)
-                    pd = int(d * coeff)
-
-                py_n, pm_n, pd_n = self.normalize_ymd(py, pm, pd)
-                
-                if ptype == "Навчання у цивільному ВНЗ":
-                    civil_y += py_n
-                    civil_m += pm_n
-                    civil_d += pd_n
-                else:
-                    pref_y += py_n
-                    pref_m += pm_n
-                    pref_d += pd_n
+        progress = QProgressDialog("Перерахунок баз підрозділів...", None, 0, len(paths), self)
+        progress.setWindowTitle("Зведений звіт")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(300)
+
+        self.batch_worker = BatchWorker(paths, path, self)
+        self.batch_worker.progress.connect(progress.setValue)
+        self.batch_worker.done.connect(lambda results: self.on_batch_done(path, results))
+        self.batch_worker.failed.connect(self.on_batch_failed)
+        self.batch_worker.finished.connect(progress.close)
+        self.batch_worker.finished.connect(self.on_batch_worker_done)
+        self.batch_worker.start()
+
+    def on_batch_done(self, path, results):
+        people = sum(count for _, count, _ in results)
+        errors = [f"{name}: {error}" for name, _, error in results if error]
+        text = f"Баз: {len(results)}, людей: {people}\nЗвіт збережено у файл:\n{path}"
+        if errors:
+            text += "\n\nНе вдалося перерахувати:\n" + "\n".join(errors)
+        QMessageBox.information(self, "Зведений звіт", text)
+
+    def on_batch_failed(self, error):
+        QMessageBox.warning(self, "Помилка зведеного звіту", f"Не вдалося скласти звіт:\n{error}")
+
+    def on_batch_worker_done(self):
+        self.batch_worker.deleteLater()
+        self.batch_worker = None
 
-            if (civil_y, civil_m, civil_d) > max_civil:
-                civil_y, civil_m, civil_d = max_civil
+    def edit_selected_people(self):
+        selected = self.selected_row()
+        if selected >= 0 and selected < len(self.infos):
+            self.edit_people(selected)
 
-            total_y_c = total_y + civil_y
-            total_m_c = total_m + civil_m
-            total_d_c = total_d + civil_d
-            total_y_c_n, total_m_c_n, total_d_c_n = self.normalize_ymd(total_y_c, total_m_c, total_d_c)
+    def show_about(self):
+        about = AboutDialog(self)
+        about.exec()
 
-            cal_years = f"{total_y_c_n} р. {total_m_c_n} м. {total_d_c_n} д."
+    def del_selected_people(self):
+        rows = self.selected_rows()
+        if not rows:
+            return
 
-            total_y_p = total_y_c_n + pref_y
-            total_m_p = total_m_c_n + pref_m
-            total_d_p = total_d_c_n + pref_d
-            total_y_p_n, total_m_p_n, total_d_p_n = self.normalize_ymd(total_y_p, total_m_p, total_d_p)
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Підтвердження видалення")
+        if len(rows) == 1:
+            msg.setText("Ви справді хочете видалити цю особу?")
+        else:
+            msg.setText(f"Ви справді хочете видалити вибраних осіб ({len(rows)})?")
+        msg.setIcon(QMessageBox.Icon.Question)
+        msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
 
-            pref_years = f"{total_y_p_n} р. {total_m_p_n} м. {total_d_p_n} д."
+        yes_button = msg.button(QMessageBox.StandardButton.Yes)
+        no_button = msg.button(QMessageBox.StandardButton.No)
+        yes_button.setText("Так")
+        no_button.setText("Ні")
 
-            info["cal_SY"] = cal_years
-            info["pref_SY"] = pref_years
+        msg.exec()
 
-            curs.execute("REPLACE INTO service_totals (person_id, calendar_years, preferenced_years) VALUES (?, ?, ?)",
-                        (person_id, cal_years, pref_years))
+        if msg.clickedButton() == yes_button:
+            person_ids = [self.infos[row].id for row in rows]
+
+            try:
+                self.db.delete_people((self.infos[row].id, self.infos[row].row_version) for row in rows)
+            except ConflictError as e:
+                self.report_conflict(e, person_ids)
+                return
+            except DB_ERRORS as e:
+                self.report_db_error(e)
+                return
+
+            self.table_model.remove_rows(rows)
+            for person_id in person_ids:
+                del self.people_by_id[person_id]
+                self.search_index.remove(person_id)
+            # Видалені люди прибираються з прогнозу ювілеїв і кешу "на дату" тим самим перерахунком
+            self.mark_dirty(*person_ids)
+            self.recompute_dirty()
+
+    def calculate_totals(self, person_ids=None, cal_periods=None, pref_periods=None):
+        if not self.infos:
+            return
 
-        conn.commit()
-        conn.close()
-        self.update_table()
+        person_ids_given = person_ids is not None
+        if not person_ids_given:
+            infos = self.infos
+        else:
+            infos = [self.people_by_id[person_id] for person_id in person_ids]
+        if cal_periods is None:
+            cal_periods = self.db.load_service_periods()
+        if pref_periods is None:
+            pref_periods = self.db.load_preference_periods()
+        from visluga_engine import totals_with_cache
+
+        person_ids = [info.id for info in infos]
+        totals, rows = totals_with_cache(person_ids, cal_periods, pref_periods, {})
+
+        for info, (cal_years, pref_years) in zip(infos, totals):
+            info.cal_SY = cal_years
+            info.pref_SY = pref_years
+
+        # Таблиця оновлюється до запису в service_totals: вислуга вже порахована, навіть якщо база зайнята
+        if person_ids_given:
+            self.table_model.people_changed(person_ids)
+        else:
+            self.update_table()
+        self.db.save_totals(rows)
 
     def show_welcome_message(self):
         welcome_text = (
@@ -743,6 +1393,42 @@ class MainProg(QMainWindow):
         msg.setStandardButtons(QMessageBox.StandardButton.Ok)
         msg.exec()
 
+def confirm_overlap(parent, clash):
+    # True - об'єднати з наявними, False - додати як є, None - повернутися до редагування дат
+    lines = "\n".join(f"{format_day(period[1])} - {format_day(period[2])}" for period in clash)
+    msg = QMessageBox(parent)
+    msg.setWindowTitle("Перетин періодів")
+    msg.setIcon(QMessageBox.Icon.Warning)
+    msg.setText(f"Новий період перетинається з уже внесеними:\n{lines}\n\nСпільні дні будуть пораховані двічі.")
+    merge_button = msg.addButton("Об'єднати", QMessageBox.ButtonRole.AcceptRole)
+    add_button = msg.addButton("Додати як є", QMessageBox.ButtonRole.DestructiveRole)
+    msg.addButton("Змінити дати", QMessageBox.ButtonRole.RejectRole)
+    msg.exec()
+    if msg.clickedButton() == merge_button:
+        return True
+    if msg.clickedButton() == add_button:
+        return False
+    return None
+
+def set_period_inputs(dialog, start_day, end_day):
+    # Заповнює дати діалогу періоду; у кожній даті рік, місяць, день - зміна року чи місяця перезаповнює списки нижче
+    dialog.filling = True
+    try:
+        start = date.fromordinal(start_day)
+        dialog.start_year_input.setCurrentText(str(start.year))
+        dialog.start_month_input.setCurrentText(str(start.month))
+        dialog.start_day_input.setCurrentText(str(start.day))
+
+        if end_day is None:
+            dialog.now_checkbox.setChecked(True)
+        else:
+            end = date.fromordinal(end_day)
+            dialog.end_year_input.setCurrentText(str(end.year))
+            dialog.end_month_input.setCurrentText(str(end.month))
+            dialog.end_day_input.setCurrentText(str(end.day))
+    finally:
+        dialog.filling = False
+
 class AddPeople(QDialog):
     def __init__(self, parent = None, info = None):
         super().__init__(parent)
@@ -753,10 +1439,7 @@ class AddPeople(QDialog):
         self.layout = QVBoxLayout()
 
         self.rank_input = QComboBox()
-        self.rank_input.addItems(["полковник", "підполковник", "майор", "капітан", "старший лейтенант",
-                                  "лейтенант", "молодший лейтенант", "майстер-сержант", "штаб-сержант",
-                                   "головний сержант", "старший сержант", "сержант", "молодший сержант",
-                                   "старший матрос", "матрос"])
+        self.rank_input.addItems(RANKS)
         if info["rank"] in [self.rank_input.itemText(i) for i in range (self.rank_input.count())]:
             self.rank_input.setCurrentText(info["rank"])
         else:
@@ -767,10 +1450,7 @@ class AddPeople(QDialog):
         self.name_input = QLineEdit(info["name"])
 
         self.unit_input = QComboBox()
-        self.unit_input.addItems(["Управління", "1 садн", "2 садн", "3 адн", "4 адн", "Реабатр",
-                                  "ДнАР", "Взвод РЕБ", "Рота охорони", "Інженерний взвод", "ПВЗ",
-                                  "ІТВ", "Ремонтна рота", "РМЗ", "Пожежний взвод", "КТП", "Оркестр",
-                                  "Медичний пункт", "Клуб", "ГКБС", "ГПСВ"])
+        self.unit_input.addItems(UNITS)
         if info["unit"] in [self.unit_input.itemText(i) for i in range (self.unit_input.count())]:
             self.unit_input.setCurrentText(info["unit"])
         else:
@@ -816,10 +1496,14 @@ class AddPeople(QDialog):
         }
 
 class AddPeriod_Calendar(QDialog):
-    def __init__(self, parent, person_data, person_id = None,):
+    def __init__(self, parent, person_data, person_id = None, existing = None):
         super().__init__(parent)
+        # Поки дати заповнюються програмно, обмеження "початок <= кінець" не застосовуються
+        self.filling = False
         self.person_id = person_id
         self.person_data = person_data
+        self.existing = existing or []
+        self.merge_periods = []
         self.setWindowTitle("Календарна вислуга")
         self.setGeometry(200, 200, 250, 300)
         self.setFixedSize(250, 300)
@@ -959,6 +1643,8 @@ class AddPeriod_Calendar(QDialog):
         day_input.addItems([str(d) for d in range(1, max_day + 1)])
 
     def update_end_constraints(self):
+        if self.filling:
+            return
         try:
             start = date(
                 int(self.start_year_input.currentText()),
@@ -978,6 +1664,8 @@ class AddPeriod_Calendar(QDialog):
             pass
 
     def update_start_constraints(self):
+        if self.filling:
+            return
         try:
             start = date(
                 int(self.start_year_input.currentText()),
@@ -996,25 +1684,47 @@ class AddPeriod_Calendar(QDialog):
         except Exception:
             pass
 
+    def accept(self):
+        period = self.get_info_data_period_cal()
+        clash = overlapping(self.existing, period["start_day"], period["end_day"])
+        if clash:
+            choice = confirm_overlap(self, clash)
+            if choice is None:
+                return
+            self.merge_periods = clash if choice else []
+        super().accept()
+
     def get_info_data_period_cal(self):
-        start_date = f"{self.start_year_input.currentText()}-{self.start_month_input.currentText().zfill(2)}-{self.start_day_input.currentText().zfill(2)}"
+        start_day = date(
+            int(self.start_year_input.currentText()),
+            int(self.start_month_input.currentText()),
+            int(self.start_day_input.currentText())
+        ).toordinal()
         
         if self.now_checkbox.isChecked():
-            end_date = "NOW"
+            end_day = None
         else:
-            end_date = f"{self.end_year_input.currentText()}-{self.end_month_input.currentText().zfill(2)}-{self.end_day_input.currentText().zfill(2)}"
+            end_day = date(
+                int(self.end_year_input.currentText()),
+                int(self.end_month_input.currentText()),
+                int(self.end_day_input.currentText())
+            ).toordinal()
         
         return {
             "person_id": self.person_id,
-            "start_date": start_date,
-            "end_date": end_date
+            "start_day": start_day,
+            "end_day": end_day
         }
 
 class AddPeriod_Pref(QDialog):
-    def __init__(self, parent, person_data, person_id = None):
+    def __init__(self, parent, person_data, person_id = None, existing = None):
         super().__init__(parent)
+        # Поки дати заповнюються програмно, обмеження "початок <= кінець" не застосовуються
+        self.filling = False
         self.person_id = person_id
         self.person_data = person_data
+        self.existing = existing or []
+        self.merge_periods = []
         self.setWindowTitle("Пільгова вислуга")
         self.setGeometry(200, 200, 250, 300)
         self.setFixedSize(250, 300)
@@ -1065,7 +1775,7 @@ class AddPeriod_Pref(QDialog):
         self.now_checkbox.stateChanged.connect(self.toggle_end_date_fields)
 
         self.pref_type_input = QComboBox()
-        self.pref_type_input.addItems(["1 день/3 дні", "1 день/2 дні", "1 день/1,5 дні", "30 днів/40 днів", "Навчання у цивільному ВНЗ"])
+        self.pref_type_input.addItems(PREF_TYPES)
         self.pref_type_input.setCurrentIndex(0)
 
         self.add_button = QPushButton("Підтвердити")
@@ -1160,6 +1870,8 @@ class AddPeriod_Pref(QDialog):
         day_input.addItems([str(d) for d in range(1, max_day + 1)])
 
     def update_end_constraints(self):
+        if self.filling:
+            return
         try:
             start = date(
                 int(self.start_year_input.currentText()),
@@ -1179,6 +1891,8 @@ class AddPeriod_Pref(QDialog):
             pass
 
     def update_start_constraints(self):
+        if self.filling:
+            return
         try:
             start = date(
                 int(self.start_year_input.currentText()),
@@ -1197,26 +1911,96 @@ class AddPeriod_Pref(QDialog):
         except Exception:
             pass
 
+    def accept(self):
+        period = self.get_info_data_period_pref()
+        same_type = [p for p in self.existing if p[3] == period["preference_type"]]
+        clash = overlapping(same_type, period["start_day"], period["end_day"])
+        if clash:
+            choice = confirm_overlap(self, clash)
+            if choice is None:
+                return
+            self.merge_periods = clash if choice else []
+        super().accept()
+
     def get_info_data_period_pref(self):
-        start_date = f"{self.start_year_input.currentText()}-{self.start_month_input.currentText().zfill(2)}-{self.start_day_input.currentText().zfill(2)}"
+        start_day = date(
+            int(self.start_year_input.currentText()),
+            int(self.start_month_input.currentText()),
+            int(self.start_day_input.currentText())
+        ).toordinal()
         
         if self.now_checkbox.isChecked():
-            end_date = "NOW"
+            end_day = None
         else:
-            end_date = f"{self.end_year_input.currentText()}-{self.end_month_input.currentText().zfill(2)}-{self.end_day_input.currentText().zfill(2)}"
+            end_day = date(
+                int(self.end_year_input.currentText()),
+                int(self.end_month_input.currentText()),
+                int(self.end_day_input.currentText())
+            ).toordinal()
         
         return {
             "person_id": self.person_id,
-            "start_date": start_date,
-            "end_date": end_date,
+            "start_day": start_day,
+            "end_day": end_day,
             "preference_type": self.pref_type_input.currentText()
         }
 
+class MilestonesDialog(QDialog):
+    def __init__(self, parent, milestones, people_by_id):
+        from visluga_forecast import MILESTONES
+
+        super().__init__(parent)
+        self.milestones = milestones
+        self.people_by_id = people_by_id
+        self.setWindowTitle("Найближчі ювілеї вислуги")
+        self.setGeometry(300, 100, 700, 500)
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        days_layout = QHBoxLayout()
+        days_layout.addWidget(QLabel(f"Хто досягне {', '.join(map(str, MILESTONES))} років вислуги протягом днів:"))
+        self.days_input = QSpinBox()
+        self.days_input.setRange(1, 3660)
+        self.days_input.setValue(30)
+        self.days_input.valueChanged.connect(self.update_table)
+        days_layout.addWidget(self.days_input)
+        days_layout.addStretch()
+
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Дата", "Військове звання", "Прізвище, ім'я", "Вислуга", "Років"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+
+        self.count_label = QLabel()
+
+        close_button = QPushButton("Закрити")
+        close_button.clicked.connect(self.close)
+
+        self.layout.addLayout(days_layout)
+        self.layout.addWidget(self.table)
+        self.layout.addWidget(self.count_label)
+        self.layout.addWidget(close_button)
+
+        self.update_table()
+
+    def update_table(self):
+        entries = self.milestones.upcoming(self.days_input.value())
+        self.table.setRowCount(len(entries))
+        for row, (day, person_id, kind, years) in enumerate(entries):
+            person = self.people_by_id.get(person_id)
+            rank = person.rank if person is not None else ""
+            who = f"{person.sec_name.upper()} {person.name}" if person is not None else f"id {person_id}"
+            for column, text in enumerate((format_day(day), rank, who, kind, str(years))):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+        self.count_label.setText(f"Знайдено: {len(entries)}")
+
 class EditPeriodsDialog(QDialog):
-    def __init__(self, parent, person_data, current_db):
+    def __init__(self, parent, person_data, db):
         super().__init__(parent)
         self.person_data = person_data
-        self.current_db = current_db
+        self.db = db
         self.setWindowTitle("Редагування періодів служби")
         self.setGeometry(300, 100, 400, 600)
         self.setFixedSize(400, 600)
@@ -1239,7 +2023,7 @@ class EditPeriodsDialog(QDialog):
         line.setFrameShape(QFrame.Shape.HLine)
         line.setFrameShadow(QFrame.Shadow.Sunken)
 
-        self.person_id = person_data["id"]
+        self.person_id = person_data.id
 
         self.cal_table = QTableWidget(0, 2)
         self.cal_table.setHorizontalHeaderLabels(["Дата початку", "Дата завершення"])
@@ -1261,8 +2045,14 @@ class EditPeriodsDialog(QDialog):
         button_layout.addWidget(self.edit_button)
         button_layout.addWidget(self.del_button)
         
-        close_button = QPushButton("Готово")
-        close_button.clicked.connect(self.close)
+        # Зміни накопичуються і записуються однією транзакцією при натисканні "Готово"
+        close_layout = QHBoxLayout()
+        save_button = QPushButton("Готово")
+        save_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Скасувати")
+        cancel_button.clicked.connect(self.reject)
+        close_layout.addWidget(save_button)
+        close_layout.addWidget(cancel_button)
                 
         self.layout.addWidget(person_label_rank)
         self.layout.addWidget(person_label_sec_name)
@@ -1273,40 +2063,36 @@ class EditPeriodsDialog(QDialog):
         self.layout.addWidget(QLabel("Пільгові періоди"))
         self.layout.addWidget(self.pref_table)
         self.layout.addLayout(button_layout)
-        self.layout.addWidget(close_button)
+        self.layout.addLayout(close_layout)
 
         self.cal_table.itemSelectionChanged.connect(self.clear_pref_selection)
         self.pref_table.itemSelectionChanged.connect(self.clear_cal_selection)
 
-        self.cal_periods_data = []
-        self.pref_periods_data = []
+        # Робочі копії рядків (id, початок, кінець[, тип], версія); до "Готово" база не змінюється
+        self.cal_periods_data = [list(row) for row in self.db.person_service_period_rows(self.person_id)]
+        self.pref_periods_data = [list(row) for row in self.db.person_preference_period_rows(self.person_id)]
+        self.cal_updates = {}
+        self.pref_updates = {}
+        self.cal_deleted = []
+        self.pref_deleted = []
+        self.changed = False
+        # ConflictError, якщо періоди тим часом змінив інший користувач (звіт показує головне вікно)
+        self.conflict = None
 
         self.load_periods()
 
     def load_periods(self):
-        conn = sqlite3.connect(self.current_db)
-        curs = conn.cursor()
-
-        self.cal_periods_data.clear()
-        self.pref_periods_data.clear()
-
-        curs.execute("SELECT start_date, end_date FROM service_periods WHERE person_id = ?", (self.person_id,))
-        periods = curs.fetchall()
-        self.cal_table.setRowCount(len(periods))
-        for row_idx, (start, end) in enumerate(periods):
-            self.cal_periods_data.append((start, end))
+        self.cal_table.setRowCount(len(self.cal_periods_data))
+        for row_idx, (_, start, end, _) in enumerate(self.cal_periods_data):
             for col_idx, value in enumerate([start, end]):
-                item = QTableWidgetItem(self.format_date(value))
+                item = QTableWidgetItem(format_day(value))
                 item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
                 self.cal_table.setItem(row_idx, col_idx, item)
             
-        curs.execute("SELECT start_date, end_date, preference_type FROM preferenced_periods WHERE person_id = ?", (self.person_id,))
-        pref_periods = curs.fetchall()
-        self.pref_table.setRowCount(len(pref_periods))
-        for row_idx, (start, end, pref) in enumerate(pref_periods):
-            self.pref_periods_data.append((start, end, pref))
+        self.pref_table.setRowCount(len(self.pref_periods_data))
+        for row_idx, (_, start, end, pref, _) in enumerate(self.pref_periods_data):
             for col_idx, value in enumerate([start, end]):
-                item = QTableWidgetItem(self.format_date(value))
+                item = QTableWidgetItem(format_day(value))
                 item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
                 self.pref_table.setItem(row_idx, col_idx, item)
 
@@ -1318,19 +2104,21 @@ class EditPeriodsDialog(QDialog):
 
         self.pref_table.resizeRowsToContents()
         self.cal_table.resizeRowsToContents()
-            
-        conn.close()
+
+    def has_pending(self):
+        return bool(self.cal_updates or self.pref_updates or self.cal_deleted or self.pref_deleted)
     
-    def get_selected_period(self):
-        selected_items_cal = self.cal_table.selectedItems()
-        selected_items_pref = self.pref_table.selectedItems()
-
-        if selected_items_cal and not selected_items_pref:
-            return 'cal', self.cal_table.currentRow()
-        elif selected_items_pref and not selected_items_cal:
-            return 'pref', self.pref_table.currentRow()
+    def get_selected_periods(self):
+        # Тип таблиці і номери всіх виділених рядків (виділяти можна кілька)
+        selected_cal = sorted({index.row() for index in self.cal_table.selectionModel().selectedRows()})
+        selected_pref = sorted({index.row() for index in self.pref_table.selectionModel().selectedRows()})
+
+        if selected_cal and not selected_pref:
+            return 'cal', selected_cal
+        elif selected_pref and not selected_cal:
+            return 'pref', selected_pref
         else:
-            return None, -1
+            return None, []
         
     def clear_cal_selection(self):
         self.cal_table.blockSignals(True)
@@ -1343,99 +2131,52 @@ class EditPeriodsDialog(QDialog):
         self.pref_table.blockSignals(False)
 
     def edit_selected_period(self):
-        ptype, row = self.get_selected_period()
-        if row < 0:
-            return
+        # Виділені періоди редагуються по черзі; "Скасувати" у діалозі пропускає період
+        ptype, rows = self.get_selected_periods()
         
-        if ptype == 'cal':
-            old_start, old_end = self.cal_periods_data[row]
-                        
-            dialog = AddPeriod_Calendar(self, self.person_data, self.person_id)
-
-            d1, m1, y1 = map(int, old_start.split("-")[2]), int(old_start.split("-")[1]), int(old_start.split("-")[0])
-            dialog.start_day_input.setCurrentText(str(d1))
-            dialog.start_month_input.setCurrentText(str(m1))
-            dialog.start_year_input.setCurrentText(str(y1))
-
-            if old_end == "NOW":
-                dialog.now_checkbox.setChecked(True)
-            else:
-                d2, m2, y2 = map(int, old_end.split("-")[2]), int(old_end.split("-")[1]), int(old_end.split("-")[0])
-                dialog.end_day_input.setCurrentText(str(d2))
-                dialog.end_month_input.setCurrentText(str(m2))
-                dialog.end_year_input.setCurrentText(str(y2))
-
-            if dialog.exec():
-                new_data = dialog.get_info_data_period_cal()
-                conn = sqlite3.connect(self.current_db)
-                curs = conn.cursor()
-                curs.execute("""
-                    UPDATE service_periods SET start_date=?, end_date=?
-                    WHERE person_id=? AND start_date=? AND end_date=?
-                """, (
-                    new_data["start_date"], new_data["end_date"],
-                    self.person_id, old_start, old_end
-                ))
-                conn.commit()
-                conn.close()
-                self.load_periods()
-                
-        elif ptype =='pref':
-            old_start, old_end, old_pref = self.pref_periods_data[row]
-            
-            dialog = AddPeriod_Pref(self, self.person_data, self.person_id)
-
-            d1, m1, y1 = map(int, old_start.split("-")[2]), int(old_start.split("-")[1]), int(old_start.split("-")[0])
-            dialog.start_day_input.setCurrentText(str(d1))
-            dialog.start_month_input.setCurrentText(str(m1))
-            dialog.start_year_input.setCurrentText(str(y1))
-                        
-            if old_end == "NOW":
-                dialog.now_checkbox.setChecked(True)
-            else:
-                d2, m2, y2 = map(int, old_end.split("-")[2]), int(old_end.split("-")[1]), int(old_end.split("-")[0])
-                dialog.end_day_input.setCurrentText(str(d2))
-                dialog.end_month_input.setCurrentText(str(m2))
-                dialog.end_year_input.setCurrentText(str(y2))
-
-            dialog.pref_type_input.setCurrentText(old_pref)
-           
-            if dialog.exec():
-                new_data = dialog.get_info_data_period_pref()
-                conn = sqlite3.connect(self.current_db)
-                curs = conn.cursor()
-                curs.execute("""
-                    UPDATE preferenced_periods SET start_date=?, end_date=?, preference_type=?
-                    WHERE person_id=? AND start_date=? AND end_date=? AND preference_type=?
-                """, (
-                    new_data["start_date"], new_data["end_date"], new_data["preference_type"],
-                    self.person_id, old_start, old_end, old_pref
-                ))
-                conn.commit()
-                conn.close()
-                self.load_periods()
+        for row in rows:
+            if ptype == 'cal':
+                period = self.cal_periods_data[row]
+                dialog = AddPeriod_Calendar(self, self.person_data, self.person_id)
+                set_period_inputs(dialog, period[1], period[2])
+
+                if dialog.exec():
+                    new_data = dialog.get_info_data_period_cal()
+                    period[1:3] = [new_data["start_day"], new_data["end_day"]]
+                    self.cal_updates[period[0]] = (tuple(period[1:3]), period[-1])
+
+            elif ptype == 'pref':
+                period = self.pref_periods_data[row]
+                dialog = AddPeriod_Pref(self, self.person_data, self.person_id)
+                set_period_inputs(dialog, period[1], period[2])
+                dialog.pref_type_input.setCurrentText(period[3])
+
+                if dialog.exec():
+                    new_data = dialog.get_info_data_period_pref()
+                    period[1:4] = [new_data["start_day"], new_data["end_day"], new_data["preference_type"]]
+                    self.pref_updates[period[0]] = (tuple(period[1:4]), period[-1])
+
+        if rows:
+            self.load_periods()
                 
     def del_selected_period(self):
-        ptype, row = self.get_selected_period()
-        if row < 0:
+        ptype, rows = self.get_selected_periods()
+        if not rows:
             return
         
         if ptype == 'cal':
-            start, end = self.cal_periods_data[row]
-            start_disp = self.cal_table.item(row, 0).text()
-            end_disp = self.cal_table.item(row, 1).text()
-            msg = f"Видалити календарний період:\n{start_disp} - {end_disp}?"
-            query = "DELETE FROM service_periods WHERE person_id = ? AND start_date = ? AND end_date = ?"
-            params = (self.person_id, start, end)
-
+            table, periods = self.cal_table, self.cal_periods_data
+            lines = [f"{table.item(row, 0).text()} - {table.item(row, 1).text()}" for row in rows]
+            msg = "Видалити календарні періоди:\n" + "\n".join(lines) + "?"
+            deleted, updates = self.cal_deleted, self.cal_updates
         else:
-            start, end, pref = self.pref_periods_data[row]
-            start_disp = self.pref_table.item(row, 0).text()
-            end_disp = self.pref_table.item(row, 1).text()
-            pref_disp = self.pref_table.item(row, 2).text()
-            msg = f"Видалити пільговий період:\n{start_disp} - {end_disp} ({pref_disp})?"
-            query = "DELETE FROM preferenced_periods WHERE person_id = ? AND start_date = ? AND end_date = ? AND preference_type = ?"
-            params = (self.person_id, start, end, pref)
+            table, periods = self.pref_table, self.pref_periods_data
+            lines = [
+                f"{table.item(row, 0).text()} - {table.item(row, 1).text()} ({table.item(row, 2).text()})"
+                for row in rows
+            ]
+            msg = "Видалити пільгові періоди:\n" + "\n".join(lines) + "?"
+            deleted, updates = self.pref_deleted, self.pref_updates
             
         confirm = QMessageBox.question(
                 self,
@@ -1444,20 +2185,44 @@ class EditPeriodsDialog(QDialog):
             )
 
         if confirm == QMessageBox.StandardButton.Yes:
-            conn = sqlite3.connect(self.current_db)
-            curs = conn.cursor()
-            curs.execute(query, params)
-            conn.commit()
-            conn.close()
+            for row in reversed(rows):
+                period = periods.pop(row)
+                updates.pop(period[0], None)
+                deleted.append((period[0], period[-1]))
             self.load_periods()
 
-    def format_date(self, date_str):
-        if date_str == "NOW":
-            return "по т.ч."
-        try:
-            return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-        except Exception:
-            return "???"
+    def accept(self):
+        if self.has_pending():
+            try:
+                with self.db.transaction():
+                    for period_id, (new, version) in self.cal_updates.items():
+                        self.db.update_service_period(period_id, new, version)
+                    for period_id, (new, version) in self.pref_updates.items():
+                        self.db.update_preference_period(period_id, new, version)
+                    self.db.delete_service_periods(self.cal_deleted)
+                    self.db.delete_preference_periods(self.pref_deleted)
+            except ConflictError as e:
+                # Нічого не збережено; діалог закривається без питання про незбережені зміни
+                self.conflict = e
+                super().reject()
+                return
+            except DB_ERRORS as e:
+                # Діалог лишається відкритим зі змінами - після відновлення з'єднання "Готово" можна натиснути знову
+                QMessageBox.warning(self, "Помилка бази даних", f"Зміни періодів не збережено:\n{e}\n\n{db_error_text(e)}")
+                return
+            self.changed = True
+        super().accept()
+
+    def reject(self):
+        if self.has_pending():
+            confirm = QMessageBox.question(
+                self,
+                "Незбережені зміни", "Відкинути зміни періодів?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if confirm != QMessageBox.StandardButton.Yes:
+                return
+        super().reject()
 
 class CreateDatabaseDialog(QDialog):
     def __init__(self, parent = None):
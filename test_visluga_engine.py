@@ -0,0 +1,163 @@
+# Ця програма входить до проєкту Вислуга років
+# Перевіряє, що visluga_engine рахує вислугу так само, як початковий цикл calculate_totals версії 0.7.8:
+# правило 30/360, коефіцієнти пільг, обмеження навчання у цивільному ВНЗ (2 р. 6 м.) і періоди "по т.ч.".
+# Запуск: python -m pytest test_visluga_engine.py (або python test_visluga_engine.py)
+
+import random
+from datetime import date
+from visluga_db import CIVIL_EDU, PREF_TYPES
+from visluga_engine import TOTALS_VERSION, compute_totals, totals_for_people, totals_with_cache
+
+TODAY = date(2026, 10, 18).toordinal()
+NOW = None
+
+# --- еталон: початковий цикл calculate_totals без змін у правилах ---
+
+def ref_date_diff(start, end):
+    years = end.year - start.year
+    months = end.month - start.month
+    days = end.day - start.day
+    if days < 0:
+        months -= 1
+        days += 30
+    if months < 0:
+        years -= 1
+        months += 12
+    return years, months, days
+
+def ref_normalize_ymd(y, m, d):
+    if d >= 30:
+        m += 1
+        d -= 30
+    if m >= 12:
+        y += 1
+        m -= 12
+    return y, m, d
+
+def ref_totals(cal, pref, today=TODAY):
+    coeffs = {"1 день/3 дні": 3.0, "1 день/2 дні": 2.0, "1 день/1,5 дні": 1.5, "30 днів/40 днів": 1.33, CIVIL_EDU: 0.5}
+    max_civil = (2, 6, 0)
+
+    def end_date(end):
+        return date.fromordinal(today if end is NOW else end)
+
+    total_y, total_m, total_d = 0, 0, 0
+    for start, end in cal:
+        y, m, d = ref_date_diff(date.fromordinal(start), end_date(end))
+        total_y += y
+        total_m += m
+        total_d += d
+
+    pref_y, pref_m, pref_d = 0, 0, 0
+    civil_y, civil_m, civil_d = 0, 0, 0
+    for start, end, ptype in pref:
+        y, m, d = ref_date_diff(date.fromordinal(start), end_date(end))
+        coeff = coeffs.get(ptype, 1.0)
+        if coeff in [1.5, 1.33, 0.5]:
+            converted_days = int((y * 360 + m * 30 + d) * coeff)
+            py, pm, pd = converted_days // 360, (converted_days % 360) // 30, (converted_days % 360) % 30
+        else:
+            py, pm, pd = int(y * coeff), int(m * coeff), int(d * coeff)
+        py, pm, pd = ref_normalize_ymd(py, pm, pd)
+        if ptype == CIVIL_EDU:
+            civil_y, civil_m, civil_d = civil_y + py, civil_m + pm, civil_d + pd
+        else:
+            pref_y, pref_m, pref_d = pref_y + py, pref_m + pm, pref_d + pd
+
+    if (civil_y, civil_m, civil_d) > max_civil:
+        civil_y, civil_m, civil_d = max_civil
+
+    cal_ymd = ref_normalize_ymd(total_y + civil_y, total_m + civil_m, total_d + civil_d)
+    pref_ymd = ref_normalize_ymd(cal_ymd[0] + pref_y, cal_ymd[1] + pref_m, cal_ymd[2] + pref_d)
+    return "{} р. {} м. {} д.".format(*cal_ymd), "{} р. {} м. {} д.".format(*pref_ymd)
+
+# --- дані ---
+
+def day(text):
+    return date.fromisoformat(text).toordinal()
+
+def random_periods(rng, count, with_type=False):
+    periods = []
+    for _ in range(count):
+        start = rng.randint(day("1985-01-01"), TODAY - 1)
+        end = NOW if rng.random() < 0.15 else rng.randint(start, min(start + 4000, TODAY))
+        periods.append((start, end, rng.choice(PREF_TYPES)) if with_type else (start, end))
+    return periods
+
+def random_people(count, seed=20261018):
+    rng = random.Random(seed)
+    cal_periods, pref_periods = {}, {}
+    for person_id in range(1, count + 1):
+        cal_periods[person_id] = random_periods(rng, rng.randint(0, 5))
+        pref_periods[person_id] = random_periods(rng, rng.randint(0, 4), with_type=True)
+    return cal_periods, pref_periods
+
+# --- перевірки ---
+
+def assert_matches_reference(cal_periods, pref_periods):
+    person_ids = list(cal_periods)
+    got = totals_for_people(person_ids, cal_periods, pref_periods, TODAY)
+    expected = [ref_totals(cal_periods[person_id], pref_periods[person_id]) for person_id in person_ids]
+    bad = [(person_id, g, e) for person_id, g, e in zip(person_ids, got, expected) if g != e]
+    assert not bad, f"розбіжностей: {len(bad)}, перші: {bad[:3]}"
+
+def test_random_people_match_reference():
+    assert_matches_reference(*random_people(4000))
+
+def test_each_rule_matches_reference():
+    start, end = day("2001-03-31"), day("2007-11-05")
+    cal_periods = {
+        1: [],
+        2: [(start, end)],
+        3: [(day("2019-02-28"), NOW)],
+    }
+    pref_periods = {1: [], 2: [], 3: []}
+    # Кожен коефіцієнт окремо, з кінцем у минулому і "по т.ч."
+    for person_id, ptype in enumerate(PREF_TYPES, start=4):
+        cal_periods[person_id] = [(start, end)]
+        pref_periods[person_id] = [(start, end, ptype), (day("2024-01-31"), NOW, ptype)]
+    # Навчання: до обмеження, рівно 2 р. 6 м. і понад нього (сумою кількох періодів)
+    cal_periods[20] = cal_periods[21] = cal_periods[22] = [(start, end)]
+    pref_periods[20] = [(day("2000-09-01"), day("2002-09-01"), CIVIL_EDU)]
+    pref_periods[21] = [(day("1995-09-01"), day("2000-09-01"), CIVIL_EDU)]
+    pref_periods[22] = [(day("1990-09-01"), day("1994-06-30"), CIVIL_EDU), (day("1995-09-01"), NOW, CIVIL_EDU)]
+    assert_matches_reference(cal_periods, pref_periods)
+
+def test_known_values():
+    # Зміна правил підрахунку має супроводжуватися збільшенням TOTALS_VERSION (збережені підсумки застаріють)
+    assert TOTALS_VERSION == 1
+    cal_periods = {1: [], 2: [(day("2010-01-15"), day("2015-03-10"))]}
+    pref_periods = {1: [], 2: [
+        (day("1990-09-01"), day("1996-06-30"), CIVIL_EDU),
+        (day("2010-01-15"), day("2011-01-15"), "1 день/3 дні"),
+    ]}
+    assert totals_for_people([1, 2], cal_periods, pref_periods, TODAY) == [
+        ("0 р. 0 м. 0 д.", "0 р. 0 м. 0 д."),
+        ("7 р. 7 м. 25 д.", "10 р. 7 м. 25 д."),
+    ]
+
+def test_array_api_and_cache_match():
+    cal_periods, pref_periods = random_people(300, seed=7)
+    person_ids = list(cal_periods)
+    formatted = totals_for_people(person_ids, cal_periods, pref_periods, TODAY)
+
+    cal_rows = [(person_id, start, end) for person_id in person_ids for start, end in cal_periods[person_id]]
+    pref_rows = [(person_id, *period) for person_id in person_ids for period in pref_periods[person_id]]
+    cal, pref = compute_totals(
+        person_ids,
+        [row[0] for row in cal_rows], [row[1] for row in cal_rows], [row[2] or 0 for row in cal_rows],
+        [row[0] for row in pref_rows], [row[1] for row in pref_rows], [row[2] or 0 for row in pref_rows],
+        [row[3] for row in pref_rows], TODAY,
+    )
+    assert [("{} р. {} м. {} д.".format(*c), "{} р. {} м. {} д.".format(*p))
+            for c, p in zip(cal.tolist(), pref.tolist())] == formatted
+
+    totals, rows = totals_with_cache(person_ids, cal_periods, pref_periods, {}, today=TODAY)
+    assert totals == formatted
+    assert len(rows) == len(person_ids)
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")
@@ -0,0 +1,118 @@
+# Ця програма входить до проєкту Вислуга років
+# Пакетний перерахунок вислуги для каталогу баз підрозділів (по одному процесу на файл) і зведений звіт
+# Запуск: python visluga_batch.py <каталог з .db> --report зведений_звіт.csv [--workers N]
+# CSV-звіт форматується паралельно у процесах; xlsx записується в головному процесі і тому повільніший
+
+import argparse, csv, io, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from visluga_db import Database
+from visluga_engine import recompute_totals
+from visluga_export import HEADERS, iter_export_rows, append_header
+
+REPORT_HEADERS = [HEADERS[0], "База даних"] + HEADERS[1:]
+SUMMARY_HEADERS = ["База даних", "Кількість людей", "Час перерахунку, с", "Помилка"]
+
+def find_databases(directory) -> list[str]:
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(".db") and os.path.isfile(os.path.join(directory, name))
+    )
+
+def report_format(path) -> str:
+    return "csv" if path.lower().endswith(".csv") else "xlsx"
+
+def recompute_file(path, today=None, fmt="csv") -> dict:
+    # Виконується в окремому процесі: власне з'єднання, перерахунок і готова частина звіту
+    started = time.perf_counter()
+    name = os.path.basename(path)
+    result = {"file": name, "people": 0, "rows": [], "csv": "", "seconds": 0.0, "error": ""}
+    try:
+        db = Database(path)
+        try:
+            totals = recompute_totals(db, today=today, use_cache=True)
+            result["people"] = len(totals)
+            rows = ([row[0], name] + row[1:] for row in iter_export_rows(db.conn))
+            if fmt == "csv":
+                text = io.StringIO()
+                csv.writer(text, delimiter=";").writerows(rows)
+                result["csv"] = text.getvalue()
+            else:
+                result["rows"] = list(rows)
+        finally:
+            db.close()
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def batch_recompute(paths, workers=None, today=None, fmt="csv", progress=None) -> list[dict]:
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(recompute_file, path, today, fmt) for path in paths]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress is not None:
+                progress(len(results))
+    # Порядок у звіті не залежить від того, який процес закінчив першим
+    results.sort(key=lambda result: result["file"])
+    return results
+
+def summary_rows(results):
+    for result in results:
+        yield [result["file"], result["people"], round(result["seconds"], 3), result["error"]]
+    yield ["Разом", sum(result["people"] for result in results), None, None]
+
+def write_report(output_path, results):
+    if report_format(output_path) == "csv":
+        # Excel відкриває такий файл напряму; підсумок по базах - у сусідньому файлі
+        with open(output_path, "w", newline="", encoding="utf-8-sig") as f:
+            csv.writer(f, delimiter=";").writerow(REPORT_HEADERS)
+            for result in results:
+                f.write(result["csv"])
+        with open(os.path.splitext(output_path)[0] + " - підсумок.csv", "w", newline="", encoding="utf-8-sig") as f:
+            csv.writer(f, delimiter=";").writerows([SUMMARY_HEADERS, *summary_rows(results)])
+        return
+
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Зведена вислуга")
+    append_header(ws, REPORT_HEADERS)
+    for result in results:
+        for row in result["rows"]:
+            ws.append(row)
+
+    summary = wb.create_sheet("Підсумок")
+    append_header(summary, SUMMARY_HEADERS)
+    for row in summary_rows(results):
+        summary.append(row)
+    wb.save(output_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетний перерахунок вислуги для баз підрозділів")
+    parser.add_argument("directory")
+    parser.add_argument("--report", default="Зведений звіт вислуги.csv", help="файл .csv або .xlsx")
+    parser.add_argument("--workers", type=int, default=None, help="кількість процесів (типово - кількість ядер)")
+    args = parser.parse_args()
+
+    paths = find_databases(args.directory)
+    if not paths:
+        print(f"У каталозі {args.directory} немає файлів .db")
+        return
+
+    started = time.perf_counter()
+    results = batch_recompute(
+        paths, args.workers, fmt=report_format(args.report),
+        progress=lambda done: print(f"Перераховано баз: {done} з {len(paths)}")
+    )
+    write_report(args.report, results)
+
+    for result in results:
+        if result["error"]:
+            print(f"Помилка у {result['file']}: {result['error']}")
+    people = sum(result["people"] for result in results)
+    print(f"Баз: {len(results)}, людей: {people}, час: {time.perf_counter() - started:.2f} с")
+    print(f"Звіт збережено у {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Ця програма входить до проєкту Вислуга років
+# Набір замірів: як кожен етап (завантаження, підрахунок, таблиця, експорт) зростає з кількістю людей.
+# Запуск без дисплея: QT_QPA_PLATFORM=offscreen python visluga_bench.py --people 1000 10000 --report bench.json
+
+import argparse, importlib.util, json, os, platform, sqlite3, sys, tempfile, time
+from datetime import datetime
+from visluga_db import load_people, load_service_periods, load_preference_periods, fill_periods
+from visluga_gen import generate
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Visluga_rokiv_v_0.7.8_beta.py")
+
+def time_open(path: str) -> float:
+    started = time.perf_counter()
+    conn = sqlite3.connect(path)
+    infos = load_people(conn)
+    fill_periods(infos, load_service_periods(conn), load_preference_periods(conn))
+    conn.close()
+    return time.perf_counter() - started
+
+def load_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    spec = importlib.util.spec_from_file_location("visluga_app", APP_FILE)
+    app_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app_module)
+    # Вітальне вікно модальне і зупинило б заміри
+    app_module.MainProg.show_welcome_message = lambda self: None
+    return app_module
+
+def timed(stages, name, func, *args):
+    started = time.perf_counter()
+    func(*args)
+    stages[name] = round(time.perf_counter() - started, 4)
+
+def bench_gui(app_module, app, path, tmp, export) -> dict:
+    stages = {}
+    # Від створення вікна до першого відображення (остання база у цей час ще не відкривається)
+    started = time.perf_counter()
+    window = app_module.MainProg()
+    window.show()
+    while window.first_paint is None:
+        app.processEvents()
+    stages["first_paint"] = round(time.perf_counter() - started, 4)
+
+    timed(stages, "open_database", window.open_database, path)
+
+    # Фонове завантаження: коли з'являються люди і коли готові періоди та вислуга
+    started = time.perf_counter()
+    window.start_loading()
+    while window.load_worker is not None:
+        app.processEvents()
+        if "first_rows" not in stages and window.infos:
+            stages["first_rows"] = round(time.perf_counter() - started, 4)
+    stages["background_load"] = round(time.perf_counter() - started, 4)
+
+    timed(stages, "load_people_from_db", window.load_people_from_db)
+    timed(stages, "load_periods", window.load_periods)
+    timed(stages, "calculate_totals", window.calculate_totals)
+
+    def update_table():
+        window.update_table()
+        app.processEvents()
+        window.resize_visible_rows()
+    timed(stages, "update_table", update_table)
+
+    if export:
+        timed(stages, "export_database_to_excel", window.export_database_to_excel, os.path.join(tmp, "export.xlsx"))
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(description="Заміри швидкодії програми 'Вислуга років'")
+    parser.add_argument("--people", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--report", default="bench_report.json")
+    parser.add_argument("--no-export", action="store_true", help="пропустити експорт у Excel (найповільніший етап)")
+    parser.add_argument("--headless", action="store_true", help="лише завантаження без Qt")
+    args = parser.parse_args()
+
+    app_module = app = None
+    import_seconds = None
+    if not args.headless:
+        started = time.perf_counter()
+        app_module = load_app()
+        import_seconds = round(time.perf_counter() - started, 4)
+        app = app_module.QApplication(sys.argv[:1])
+
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # MainProg читає last_db.txt з робочого каталогу, тому заміри йдуть у тимчасовому
+        os.chdir(tmp)
+        try:
+            for size in args.people:
+                path = os.path.join(tmp, f"bench_{size}.db")
+                started = time.perf_counter()
+                counts = generate(path, size)
+                entry = {**counts, "generate": round(time.perf_counter() - started, 4)}
+                entry["headless_open"] = round(min(time_open(path) for _ in range(3)), 4)
+                if app is not None:
+                    entry["stages"] = bench_gui(app_module, app, path, tmp, not args.no_export)
+                results.append(entry)
+                print(json.dumps(entry, ensure_ascii=False))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "import_app": import_seconds,
+        "results": results,
+    }
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Звіт збережено у {args.report}")
+
+if __name__ == "__main__":
+    main()
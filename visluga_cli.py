@@ -0,0 +1,172 @@
+# Ця програма входить до проєкту Вислуга років
+# Командний рядок без графічного інтерфейсу: перерахунок, експорт, імпорт і статистика бази.
+# Qt тут не імпортується зовсім, а numpy і openpyxl - лише тими командами, яким вони потрібні,
+# тож запуск за розкладом на сервері без дисплея займає мілісекунди і кілька копій можуть працювати паралельно.
+# Запуск: python visluga_cli.py <база.db> recompute|totals|export|changes|import|stats ...
+
+import argparse, os, sys, time
+from visluga_db import BUSY_TIMEOUT_MS, Database, MigrationError, format_day
+
+def cmd_recompute(db, args):
+    from visluga_engine import recompute_totals
+
+    started = time.perf_counter()
+    totals = recompute_totals(db, args.person or None, use_cache=not args.full)
+    print(f"Перераховано людей: {len(totals)}, час: {time.perf_counter() - started:.2f} с")
+    return 0
+
+def parse_days(text):
+    from visluga_import import parse_date
+
+    try:
+        return [parse_date(part) for part in text.split(",") if part.strip()]
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def cmd_totals(db, args):
+    from visluga_engine import totals_as_of
+    from visluga_export import export_to_csv, export_to_xlsx
+
+    # Підсумки на кожну дату з однієї побудови індексу; збережена вислуга (на сьогодні) не змінюється
+    people = db.people_by_ids(args.person) if args.person else db.load_people()
+    person_ids = [person.id for person in people]
+    by_day = totals_as_of(db, args.as_of, person_ids)
+    headers = ["id", "Військове звання", "Прізвище", "Ім'я По батькові"]
+    for day in args.as_of:
+        headers += [f"Календарна на {format_day(day)}", f"Пільгова на {format_day(day)}"]
+    rows = []
+    for person in people:
+        row = [person.id, person.rank, person.sec_name, person.name]
+        for day in args.as_of:
+            row.extend(by_day[day][person.id])
+        rows.append(row)
+    if args.output is None:
+        print(";".join(headers))
+        for row in rows:
+            print(";".join(str(value) for value in row))
+    elif args.output.lower().endswith(".csv"):
+        export_to_csv(args.output, rows, headers)
+    else:
+        export_to_xlsx(args.output, rows, headers=headers)
+    return 0
+
+def cmd_export(db, args):
+    from visluga_engine import recompute_totals
+    from visluga_export import iter_export_rows, export_to_csv, export_to_xlsx
+
+    started = time.perf_counter()
+    if not args.no_recompute:
+        # Вислуга з періодами "по т.ч." щодня інша; перераховуються лише застарілі рядки
+        recompute_totals(db, use_cache=True)
+    if args.output.lower().endswith(".csv"):
+        export_to_csv(args.output, iter_export_rows(db.conn))
+    else:
+        export_to_xlsx(args.output, iter_export_rows(db.conn))
+    print(f"Експортовано у {args.output}, час: {time.perf_counter() - started:.2f} с")
+    return 0
+
+def cmd_changes(db, args):
+    from visluga_engine import recompute_totals
+    from visluga_export import CHANGE_HEADERS, iter_change_rows, export_to_csv, export_to_xlsx
+
+    since = db.last_exported_change() if args.since is None else args.since
+    last = db.last_change()
+    changed = db.changed_people(since, last)
+    if changed:
+        recompute_totals(db, changed, use_cache=True)
+    rows = list(iter_change_rows(db.conn, since, last))
+    if args.output.lower().endswith(".csv"):
+        export_to_csv(args.output, rows, CHANGE_HEADERS)
+    else:
+        export_to_xlsx(args.output, rows, headers=CHANGE_HEADERS)
+    db.save_change_export(last, os.path.abspath(args.output))
+    print(f"Змін з номера {since} до {last}: людей {len(rows)}. Збережено у {args.output}")
+    return 0
+
+def cmd_import(db, args):
+    from visluga_import import ImportValidationError, import_file
+
+    try:
+        stats = import_file(db, args.input)
+    except ImportValidationError as e:
+        print(f"Файл не імпортовано. {e}", file=sys.stderr)
+        for error in e.errors:
+            print(error, file=sys.stderr)
+        return 1
+    print(
+        f"Імпортовано людей: {stats['people']}, періодів: {stats['periods']}, "
+        f"час: {stats['seconds']:.2f} с ({stats['rows_per_second']:.0f} рядків/с)"
+    )
+    return 0
+
+def cmd_stats(db, args):
+    conn = db.conn
+    people = conn.execute("SELECT count(*) FROM people").fetchone()[0]
+    cal, cal_open = conn.execute("SELECT count(*), count(*) - count(end_day) FROM service_periods").fetchone()
+    pref, pref_open = conn.execute("SELECT count(*), count(*) - count(end_day) FROM preferenced_periods").fetchone()
+    totals = conn.execute("SELECT count(*) FROM service_totals").fetchone()[0]
+    print(f"База: {db.path}")
+    print(f"Людей: {people}")
+    print(f"Календарних періодів: {cal} (по т.ч.: {cal_open})")
+    print(f"Пільгових періодів: {pref} (по т.ч.: {pref_open})")
+    print(f"Збережених підсумків вислуги: {totals}")
+    for unit, count in conn.execute("SELECT unit, count(*) FROM people GROUP BY unit ORDER BY count(*) DESC"):
+        print(f"  {unit or '-'}: {count}")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="'Вислуга років' з командного рядка")
+    parser.add_argument("database", help="файл бази даних .db")
+    parser.add_argument(
+        "--busy-timeout", type=int, default=BUSY_TIMEOUT_MS,
+        help="скільки мс чекати, поки базу звільнить інша копія програми (типово %(default)s)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    recompute = commands.add_parser("recompute", help="перерахувати і зберегти вислугу")
+    recompute.add_argument("--person", type=int, nargs="+", help="лише вказані id людей")
+    recompute.add_argument("--full", action="store_true", help="перерахувати всіх, не зважаючи на збережені підсумки")
+    recompute.set_defaults(func=cmd_recompute)
+
+    totals = commands.add_parser("totals", help="вислуга на вказані дати без збереження в базі")
+    totals.add_argument(
+        "--as-of", type=parse_days, required=True, metavar="ДАТА,ДАТА,...", help="дати у вигляді дд.мм.рррр через кому"
+    )
+    totals.add_argument("--person", type=int, nargs="+", help="лише вказані id людей")
+    totals.add_argument("--output", help="файл .xlsx або .csv (типово - вивід на екран)")
+    totals.set_defaults(func=cmd_totals)
+
+    export = commands.add_parser("export", help="експортувати базу у .xlsx або .csv")
+    export.add_argument("output")
+    export.add_argument("--no-recompute", action="store_true", help="не оновлювати вислугу перед експортом")
+    export.set_defaults(func=cmd_export)
+
+    changes = commands.add_parser("changes", help="експортувати лише людей, змінених після номера журналу")
+    changes.add_argument("output")
+    changes.add_argument("--since", type=int, default=None, help="номер зміни (типово - кінець попереднього експорту)")
+    changes.set_defaults(func=cmd_changes)
+
+    import_parser = commands.add_parser("import", help="імпортувати людей з .xlsx або .csv")
+    import_parser.add_argument("input")
+    import_parser.set_defaults(func=cmd_import)
+
+    stats = commands.add_parser("stats", help="кількість людей і періодів у базі")
+    stats.set_defaults(func=cmd_stats)
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.database):
+        print(f"Файл бази {args.database} не знайдено", file=sys.stderr)
+        return 1
+
+    try:
+        db = Database(args.database, busy_timeout=args.busy_timeout)
+    except MigrationError as e:
+        print(f"Базу {args.database} не оновлено. {e}", file=sys.stderr)
+        return 1
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
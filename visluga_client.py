@@ -0,0 +1,168 @@
+# Ця програма входить до проєкту Вислуга років
+# Клієнт локального сервера (visluga_server.py) з тим самим набором методів, що й visluga_db.Database,
+# тож вікно програми працює з сервером так само, як із файлом бази.
+# Записи всередині transaction() накопичуються і йдуть на сервер одним запитом (атомарно).
+
+import http.client, json
+from contextlib import contextmanager
+from urllib.parse import unquote, urlsplit
+from visluga_db import BUSY_TIMEOUT_MS, Database, ConflictError, Person, group_service_periods, group_preference_periods
+
+class ServerError(Exception):
+    pass
+
+def is_server_url(path) -> bool:
+    return str(path).startswith("http://")
+
+def connect(path, busy_timeout=BUSY_TIMEOUT_MS):
+    # Файл бази або адреса сервера http://host:port (сервер чекає на блокування сам, зі своїм --busy-timeout)
+    return RemoteDatabase(path) if is_server_url(path) else Database(path, busy_timeout=busy_timeout)
+
+class RemoteDatabase:
+    # Прямого з'єднання SQLite немає: FTS, експорт, імпорт і перевірка перетинів працюють лише з файлом
+    conn = None
+
+    def __init__(self, url, timeout=30):
+        self.path = url
+        parts = urlsplit(url)
+        self.http = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+        # Ключ доступу сервера з адреси http://ключ@сервер:порт
+        self.headers = {"X-Visluga-Token": unquote(parts.username)} if parts.username else {}
+        # Для повідомлень - без ключа
+        self.address = f"{parts.hostname}:{parts.port or 80}"
+        self._ops = None
+        self._depth = 0
+        self.request("GET", "/status")
+
+    def close(self):
+        self.http.close()
+
+    def request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = dict(self.headers)
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        try:
+            self.http.request(method, path, body, headers)
+            response = self.http.getresponse()
+            data = json.loads(response.read() or b"null")
+        except (OSError, http.client.HTTPException) as e:
+            # Наступний запит відкриє з'єднання заново
+            self.http.close()
+            raise ServerError(f"Сервер {self.address} недоступний: {e}") from e
+        if response.status == 409:
+            raise ConflictError(data["conflicts"])
+        if response.status != 200:
+            raise ServerError(data.get("error", f"HTTP {response.status}") if isinstance(data, dict) else data)
+        return data
+
+    @contextmanager
+    def transaction(self):
+        if self._depth:
+            self._depth += 1
+            try:
+                yield None
+            finally:
+                self._depth -= 1
+            return
+
+        self._ops = []
+        self._depth = 1
+        try:
+            yield None
+            ops = self._ops
+        finally:
+            self._ops = None
+            self._depth = 0
+        if ops:
+            self.write(ops)
+
+    def write(self, ops):
+        return self.request("POST", "/write", {"ops": ops})["results"]
+
+    def _write_op(self, name, **args):
+        if self._ops is not None:
+            self._ops.append([name, args])
+            return None
+        return self.write([[name, args]])[0]
+
+    # --- читання ---
+
+    def load_people(self):
+        return [Person(*row) for row in self.request("GET", "/people")]
+
+    def people_by_ids(self, person_ids):
+        return [Person(*row) for row in self.request("POST", "/people", {"person_ids": list(person_ids)})]
+
+    def load_service_periods(self):
+        return group_service_periods(self.request("GET", "/service_periods"))
+
+    def load_preference_periods(self):
+        return group_preference_periods(self.request("GET", "/preference_periods"))
+
+    def load_totals(self):
+        return {row[0]: tuple(row[1:]) for row in self.request("GET", "/totals")}
+
+    def periods_for(self, person_ids):
+        periods = self.request("POST", "/periods", {"person_ids": list(person_ids)})
+        return group_service_periods(periods["cal"]), group_preference_periods(periods["pref"])
+
+    def person_service_period_rows(self, person_id):
+        return [tuple(row) for row in self.request("POST", "/period_rows", {"person_id": person_id})["cal"]]
+
+    def person_preference_period_rows(self, person_id):
+        return [tuple(row) for row in self.request("POST", "/period_rows", {"person_id": person_id})["pref"]]
+
+    def last_change(self) -> int:
+        return self.request("GET", "/status")["seq"]
+
+    def changes_since(self, since) -> dict:
+        return self.request("GET", f"/changes?since={int(since)}")
+
+    # --- запис ---
+
+    def add_person(self, info) -> int:
+        # id потрібен одразу, тому нова людина не може чекати кінця transaction()
+        if self._ops is not None:
+            raise ServerError("add_person не можна викликати всередині transaction()")
+        info = {key: info[key] for key in ("rank", "sec_name", "name", "unit", "note")}
+        return self._write_op("add_person", info=info)
+
+    def update_person(self, person_id, info, version):
+        info = {key: info[key] for key in ("rank", "sec_name", "name", "unit", "note")}
+        self._write_op("update_person", person_id=person_id, info=info, version=version)
+
+    def delete_people(self, people):
+        self._write_op("delete_people", people=[list(person) for person in people])
+
+    def add_service_period(self, person_id, start, end):
+        self._write_op("add_service_periods", rows=[[person_id, start, end]])
+
+    def add_preference_period(self, person_id, start, end, pref_type):
+        self._write_op("add_preference_periods", rows=[[person_id, start, end, pref_type]])
+
+    def add_service_periods(self, rows):
+        self._write_op("add_service_periods", rows=[list(row) for row in rows])
+
+    def add_preference_periods(self, rows):
+        self._write_op("add_preference_periods", rows=[list(row) for row in rows])
+
+    def update_service_period(self, period_id, new, version):
+        self._write_op("update_service_period", period_id=period_id, period=list(new), version=version)
+
+    def update_preference_period(self, period_id, new, version):
+        self._write_op("update_preference_period", period_id=period_id, period=list(new), version=version)
+
+    def delete_service_periods(self, periods):
+        periods = [list(period) for period in periods]
+        if periods:
+            self._write_op("delete_service_periods", periods=periods)
+
+    def delete_preference_periods(self, periods):
+        periods = [list(period) for period in periods]
+        if periods:
+            self._write_op("delete_preference_periods", periods=periods)
+
+    def save_totals(self, rows):
+        # Сервер сам перераховує і зберігає підсумки після кожної пачки записів
+        pass
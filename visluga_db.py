@@ -0,0 +1,605 @@
+# Ця програма входить до проєкту Вислуга років
+# Відповідає за схему бази даних (міграції), спільне з'єднання та читання людей і періодів служби
+
+import os, random, sqlite3, sys, time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+
+CIVIL_EDU = "Навчання у цивільному ВНЗ"
+
+RANKS = ["полковник", "підполковник", "майор", "капітан", "старший лейтенант",
+         "лейтенант", "молодший лейтенант", "майстер-сержант", "штаб-сержант",
+         "головний сержант", "старший сержант", "сержант", "молодший сержант",
+         "старший матрос", "матрос"]
+UNITS = ["Управління", "1 садн", "2 садн", "3 адн", "4 адн", "Реабатр",
+         "ДнАР", "Взвод РЕБ", "Рота охорони", "Інженерний взвод", "ПВЗ",
+         "ІТВ", "Ремонтна рота", "РМЗ", "Пожежний взвод", "КТП", "Оркестр",
+         "Медичний пункт", "Клуб", "ГКБС", "ГПСВ"]
+PREF_TYPES = ["1 день/3 дні", "1 день/2 дні", "1 день/1,5 дні", "30 днів/40 днів", CIVIL_EDU]
+
+# Скільки SQLite сам чекає на блокування іншої копії програми (мс), і скільки разів після цього
+# запис повторюється з випадковою паузою
+BUSY_TIMEOUT_MS = 3000
+BUSY_RETRIES = 4
+RETRY_DELAY = 0.05
+
+VERSIONED_TABLES = ("people", "service_periods", "preferenced_periods")
+TABLE_TITLES = {"people": "Людину", "service_periods": "Календарний період", "preferenced_periods": "Пільговий період"}
+
+class ConflictError(Exception):
+    # Рядок змінила або видалила інша копія програми після того, як його було прочитано.
+    # conflicts - список {"table", "id", "deleted"}; транзакція, у якій сталася помилка, скасовується повністю.
+    def __init__(self, conflicts):
+        super().__init__("; ".join(describe_conflict(conflict) for conflict in conflicts))
+        self.conflicts = conflicts
+
+def describe_conflict(conflict) -> str:
+    action = "видалено" if conflict["deleted"] else "змінено"
+    return f"{TABLE_TITLES[conflict['table']]} (id {conflict['id']}) {action} іншим користувачем"
+
+class MigrationError(Exception):
+    # Базу не вдалося оновити до нової схеми; міграцію скасовано, файл лишився без змін
+    pass
+
+def _migration_1(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS people (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rank TEXT NOT NULL,
+            sec_name TEXT NOT NULL,
+            name TEXT NOT NULL,
+            unit TEXT NOT NULL,
+            note TEXT
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS service_periods (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            person_id INTEGER NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS preferenced_periods (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            person_id INTEGER NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            preference_type TEXT NOT NULL,
+            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS service_totals (
+            person_id INTEGER PRIMARY KEY,
+            calendar_years TEXT,
+            preferenced_years TEXT,
+            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE
+        )
+    """)
+
+def _migration_2(conn):
+    # Покривні індекси: вибірка періодів однієї людини читає лише індекс, без сканування таблиці.
+    # service_totals.person_id уже є rowid, тому окремий індекс для підсумків не потрібен.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_service_periods_person
+        ON service_periods (person_id, start_date, end_date)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_preferenced_periods_person
+        ON preferenced_periods (person_id, start_date, end_date, preference_type)
+    """)
+
+def _migration_3(conn):
+    # Дати зберігаються як номер дня (date.toordinal()), відкритий період "по т.ч." - як NULL у end_day
+    conn.execute("""
+        CREATE TABLE service_periods_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            person_id INTEGER NOT NULL,
+            start_day INTEGER NOT NULL,
+            end_day INTEGER,
+            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE preferenced_periods_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            person_id INTEGER NOT NULL,
+            start_day INTEGER NOT NULL,
+            end_day INTEGER,
+            preference_type TEXT NOT NULL,
+            FOREIGN KEY (person_id) REFERENCES people(id) ON DELETE CASCADE
+        )
+    """)
+
+    for table, extra in (("service_periods", ""), ("preferenced_periods", ", preference_type")):
+        # Стара програма видаляла лише рядок людини (foreign_keys були вимкнені), тож періоди видалених
+        # людей лишалися у файлі. Вони нікому не належать і в нову таблицю не переносяться.
+        orphans = conn.execute(
+            f"SELECT count(*) FROM {table} WHERE person_id NOT IN (SELECT id FROM people)"
+        ).fetchone()[0]
+        if orphans:
+            print(f"Не перенесено періодів видалених людей: {table} - {orphans}")
+        rows = []
+        bad = []
+        for row in conn.execute(
+            f"SELECT id, person_id, start_date, end_date{extra} FROM {table} "
+            f"WHERE person_id IN (SELECT id FROM people)"
+        ):
+            try:
+                rows.append((row[0], row[1], text_to_day(row[2]), text_to_day(row[3]), *row[4:]))
+            except (TypeError, ValueError):
+                bad.append(f"{table} id={row[0]}, людина id={row[1]}: {row[2]} - {row[3]}")
+        if bad:
+            # Без дати період не перенести, а пропустити - означає втратити його назавжди
+            raise MigrationError(
+                "Періоди з датами, які не вдалося розібрати (очікується РРРР-ММ-ДД або NOW):\n"
+                + "\n".join(bad[:20]) + (f"\n... та ще {len(bad) - 20}" if len(bad) > 20 else "")
+                + "\nВиправте їх у файлі бази і відкрийте його знову."
+            )
+        marks = ", ?" if extra else ""
+        conn.executemany(
+            f"INSERT INTO {table}_new (id, person_id, start_day, end_day{extra}) VALUES (?, ?, ?, ?{marks})", rows
+        )
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+    conn.execute("""
+        CREATE INDEX idx_service_periods_person
+        ON service_periods (person_id, start_day, end_day)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_preferenced_periods_person
+        ON preferenced_periods (person_id, start_day, end_day, preference_type)
+    """)
+
+def _migration_4(conn):
+    # service_totals стає кешем: дата, на яку пораховано (номер дня), і відбиток періодів людини.
+    # Старі рядки без відбитка вважаються застарілими і будуть перераховані при першому відкритті.
+    conn.execute("ALTER TABLE service_totals ADD COLUMN as_of INTEGER")
+    conn.execute("ALTER TABLE service_totals ADD COLUMN fingerprint INTEGER")
+
+JOURNALED_TABLES = (("people", "id"), ("service_periods", "person_id"), ("preferenced_periods", "person_id"))
+
+def _migration_5(conn):
+    # Журнал змін: тригери записують кожну вставку, зміну і видалення людей та періодів
+    # з номером, що лише зростає (AUTOINCREMENT не використовує номери повторно).
+    # Зміни, зроблені до цієї міграції, у журнал не потрапляють - відправною точкою є повний експорт.
+    conn.execute("""
+        CREATE TABLE change_journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            person_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+    # Які номери змін уже відправлено (кожен експорт змін додає рядок)
+    conn.execute("""
+        CREATE TABLE change_exports (
+            seq INTEGER NOT NULL,
+            exported_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+            path TEXT
+        )
+    """)
+    for table, person_column in JOURNALED_TABLES:
+        for operation, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            conn.execute(f"""
+                CREATE TRIGGER {table}_journal_{operation.lower()} AFTER {operation} ON {table} BEGIN
+                    INSERT INTO change_journal (table_name, row_id, person_id, operation)
+                    VALUES ('{table}', {row}.id, {row}.{person_column}, '{operation.lower()}');
+                END
+            """)
+
+def _migration_6(conn):
+    # Номер версії рядка: кожна зміна збільшує його на 1, а зміна чи видалення виконуються лише тоді,
+    # коли версія та сама, що була прочитана (інакше рядок тим часом змінив інший користувач)
+    for table in VERSIONED_TABLES:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1")
+
+# Нові зміни схеми додаються в кінець списку; номер міграції = позиція у списку + 1
+MIGRATIONS = [
+    _migration_1,
+    _migration_2,
+    _migration_3,
+    _migration_4,
+    _migration_5,
+    _migration_6,
+]
+
+def migrate(conn) -> int:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number in range(version + 1, len(MIGRATIONS) + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        print(f"Схему бази даних оновлено до версії {number}.")
+    return max(version, len(MIGRATIONS))
+
+def init_db(db_name=None):
+    db_path = os.path.join(os.getcwd(), db_name)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    migrate(conn)
+    conn.close()
+    print("Базу даних ініціалізовано.")
+
+def text_to_day(date_str):
+    # Старий текстовий формат: "YYYY-MM-DD" або "NOW" (відкритий період -> None)
+    if date_str == "NOW":
+        return None
+    return datetime.strptime(date_str, "%Y-%m-%d").toordinal()
+
+@lru_cache(maxsize=None)
+def format_day(day):
+    if day is None:
+        return "по т.ч."
+    return date.fromordinal(day).strftime("%d.%m.%Y")
+
+class Person:
+    # Компактний запис людини: періоди зберігаються як кортежі номерів днів,
+    # рядки для таблиці ("cal_periods", "pref_periods", "civil_edu") складаються лише при показі.
+    # Читання через person["rank"] / person.get("rank") лишене для діалогів, які приймають і словники.
+    __slots__ = ("id", "rank", "sec_name", "name", "unit", "note", "row_version", "cal", "pref", "cal_SY", "pref_SY")
+
+    def __init__(self, id=None, rank="", sec_name="", name="", unit="", note="", row_version=1):
+        self.id = id
+        # Звання, підрозділи, прізвища й імена часто повторюються - один рядок на всі однакові
+        self.rank = sys.intern(rank or "")
+        self.sec_name = sys.intern(sec_name or "")
+        self.name = sys.intern(name or "")
+        self.unit = sys.intern(unit or "")
+        self.note = note
+        self.row_version = row_version
+        self.cal = ()
+        self.pref = ()
+        self.cal_SY = ""
+        self.pref_SY = ""
+
+    @property
+    def cal_periods(self):
+        return format_cal_periods(self.cal)
+
+    @property
+    def pref_periods(self):
+        return format_pref_periods(self.pref)[0]
+
+    @property
+    def civil_edu(self):
+        return format_pref_periods(self.pref)[1]
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def update(self, info):
+        for key, value in info.items():
+            setattr(self, key, value)
+
+PERSON_COLUMNS = "id, rank, sec_name, name, unit, note, row_version"
+
+def load_people(conn) -> list[Person]:
+    return [Person(*row) for row in conn.execute(f"SELECT {PERSON_COLUMNS} FROM people")]
+
+def people_by_ids(conn, person_ids) -> list[Person]:
+    people = []
+    for first in range(0, len(person_ids), ID_CHUNK):
+        chunk = person_ids[first:first + ID_CHUNK]
+        people.extend(
+            Person(*row) for row in
+            conn.execute(f"SELECT {PERSON_COLUMNS} FROM people WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        )
+    return people
+
+def group_service_periods(rows) -> dict[int, list[tuple]]:
+    # rows - (person_id, початок, кінець) у порядку id періодів.
+    # Однакові дні (їх лише кілька тисяч різних) ділять один об'єкт int на всі періоди
+    days = {}
+    periods = defaultdict(list)
+    for person_id, start, end in rows:
+        periods[person_id].append((days.setdefault(start, start), days.setdefault(end, end)))
+    return periods
+
+def group_preference_periods(rows) -> dict[int, list[tuple]]:
+    days = {}
+    periods = defaultdict(list)
+    for person_id, start, end, pref_type in rows:
+        periods[person_id].append((days.setdefault(start, start), days.setdefault(end, end), sys.intern(pref_type)))
+    return periods
+
+def load_service_periods(conn) -> dict[int, list[tuple]]:
+    return group_service_periods(conn.execute("SELECT person_id, start_day, end_day FROM service_periods ORDER BY id"))
+
+def load_preference_periods(conn) -> dict[int, list[tuple]]:
+    return group_preference_periods(conn.execute(
+        "SELECT person_id, start_day, end_day, preference_type FROM preferenced_periods ORDER BY id"
+    ))
+
+# Скільки id підставляється в один запит "... IN (?, ?, ...)"
+ID_CHUNK = 500
+
+def period_rows_for(conn, person_ids) -> tuple[list, list]:
+    # Рядки періодів лише вказаних людей, як у load_*_periods; кожна людина цілком в одній частині,
+    # тому порядок її періодів за id зберігається
+    cal = []
+    pref = []
+    person_ids = list(person_ids)
+    for first in range(0, len(person_ids), ID_CHUNK):
+        chunk = person_ids[first:first + ID_CHUNK]
+        marks = ", ".join("?" * len(chunk))
+        cal.extend(conn.execute(
+            f"SELECT person_id, start_day, end_day FROM service_periods WHERE person_id IN ({marks}) ORDER BY id", chunk
+        ))
+        pref.extend(conn.execute(
+            f"SELECT person_id, start_day, end_day, preference_type FROM preferenced_periods "
+            f"WHERE person_id IN ({marks}) ORDER BY id", chunk
+        ))
+    return cal, pref
+
+def load_periods_for(conn, person_ids) -> tuple[dict, dict]:
+    cal, pref = period_rows_for(conn, person_ids)
+    return group_service_periods(cal), group_preference_periods(pref)
+
+def load_totals(conn) -> dict[int, tuple]:
+    return {
+        row[0]: row[1:] for row in conn.execute(
+            "SELECT person_id, calendar_years, preferenced_years, as_of, fingerprint FROM service_totals"
+        )
+    }
+
+def format_cal_periods(periods) -> str:
+    return "\n".join(f"{format_day(start)} - {format_day(end)}" for start, end in periods)
+
+def format_pref_periods(periods) -> tuple[str, str]:
+    general = []
+    civil = []
+
+    for start, end, pref_type in periods:
+        if pref_type.strip().lower() == CIVIL_EDU.lower():
+            civil.append(f"{format_day(start)} - {format_day(end)}")
+        else:
+            general.append(f"{format_day(start)} - {format_day(end)} ({pref_type})")
+
+    return "\n".join(general), "\n".join(civil)
+
+def fill_person_periods(person, cal_periods, pref_periods):
+    person.cal = tuple(cal_periods)
+    person.pref = tuple(pref_periods)
+
+def fill_periods(people, cal_periods, pref_periods):
+    for person in people:
+        fill_person_periods(person, cal_periods.get(person.id, ()), pref_periods.get(person.id, ()))
+
+SQL_INSERT_PERSON = "INSERT INTO people (rank, sec_name, name, unit, note) VALUES (?, ?, ?, ?, ?)"
+# Зміна і видалення - лише якщо версія рядка та сама, що була прочитана (останні два параметри: id, версія)
+SQL_UPDATE_PERSON = """
+    UPDATE people SET rank = ?, sec_name = ?, name = ?, unit = ?, note = ?, row_version = row_version + 1
+    WHERE id = ? AND row_version = ?
+"""
+SQL_DELETE_PERSON = "DELETE FROM people WHERE id = ? AND row_version = ?"
+SQL_INSERT_CAL = "INSERT INTO service_periods (person_id, start_day, end_day) VALUES (?, ?, ?)"
+SQL_INSERT_PREF = """
+    INSERT INTO preferenced_periods (person_id, start_day, end_day, preference_type) VALUES (?, ?, ?, ?)
+"""
+# Рядки періодів з id і версією (остання): редагування і видалення адресуються за первинним ключем, а не за датами
+SQL_PERSON_CAL_ROWS = "SELECT id, start_day, end_day, row_version FROM service_periods WHERE person_id = ? ORDER BY id"
+SQL_PERSON_PREF_ROWS = """
+    SELECT id, start_day, end_day, preference_type, row_version FROM preferenced_periods WHERE person_id = ? ORDER BY id
+"""
+SQL_UPDATE_CAL = """
+    UPDATE service_periods SET start_day = ?, end_day = ?, row_version = row_version + 1
+    WHERE id = ? AND row_version = ?
+"""
+SQL_UPDATE_PREF = """
+    UPDATE preferenced_periods SET start_day = ?, end_day = ?, preference_type = ?, row_version = row_version + 1
+    WHERE id = ? AND row_version = ?
+"""
+SQL_DELETE_CAL = "DELETE FROM service_periods WHERE id = ? AND row_version = ?"
+SQL_DELETE_PREF = "DELETE FROM preferenced_periods WHERE id = ? AND row_version = ?"
+SQL_SAVE_TOTALS = """
+    REPLACE INTO service_totals (person_id, calendar_years, preferenced_years, as_of, fingerprint)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+def is_network_path(path) -> bool:
+    # WAL потребує спільної пам'яті на одному комп'ютері і через мережеву папку не працює
+    path = os.path.abspath(path)
+    if path.startswith(("\\\\", "//")):
+        return True
+    if sys.platform == "win32":
+        import ctypes
+
+        # Мережевий диск, підключений як літера (Z:), - DRIVE_REMOTE
+        return ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(path)[0] + "\\") == 4
+    return False
+
+def is_busy(error) -> bool:
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+class Database:
+    # Одне з'єднання на весь час роботи з базою: WAL, кеш сторінок і кеш скомпільованих запитів
+    def __init__(self, path, cache_kib=20000, busy_timeout=BUSY_TIMEOUT_MS, retries=BUSY_RETRIES, journal_mode=None):
+        self.path = path
+        self.retries = retries
+        if journal_mode is None:
+            journal_mode = "DELETE" if is_network_path(path) else "WAL"
+        self.conn = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+        self.conn.execute(f"PRAGMA busy_timeout={int(busy_timeout)}")
+        # Зміна режиму журналу теж бере блокування, тож при відкритті може чекати на інші копії програми
+        self._execute_retry(f"PRAGMA journal_mode={journal_mode}")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA cache_size=-{int(cache_kib)}")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._depth = 0
+        try:
+            migrate(self.conn)
+        except BaseException:
+            self.conn.close()
+            raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _execute_retry(self, sql):
+        # busy_timeout уже почекав на блокування; якщо його не вистачило - ще кілька спроб із випадковою
+        # паузою, що зростає, щоб копії програми, які чекали разом, не зіткнулися знову в ту саму мить
+        for attempt in range(self.retries + 1):
+            try:
+                return self.conn.execute(sql)
+            except sqlite3.OperationalError as e:
+                if attempt == self.retries or not is_busy(e):
+                    raise
+                time.sleep(random.uniform(0, RETRY_DELAY * 2 ** attempt))
+
+    @contextmanager
+    def transaction(self):
+        if self._depth:
+            self._depth += 1
+            try:
+                yield self.conn
+            finally:
+                self._depth -= 1
+            return
+
+        # Блокування на запис береться одразу, тож чекати доводиться лише на BEGIN і (без WAL) на COMMIT
+        self._execute_retry("BEGIN IMMEDIATE")
+        self._depth = 1
+        try:
+            yield self.conn
+            self._execute_retry("COMMIT")
+        except BaseException:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._depth = 0
+
+    def _versioned(self, table, sql, rows):
+        # rows - параметри запиту, останні два з них: id і прочитана версія рядка
+        conflicts = []
+        with self.transaction():
+            for params in rows:
+                if self.conn.execute(sql, params).rowcount == 0:
+                    row_id = params[-2]
+                    deleted = self.conn.execute(f"SELECT 1 FROM {table} WHERE id = ?", (row_id,)).fetchone() is None
+                    conflicts.append({"table": table, "id": row_id, "deleted": deleted})
+            if conflicts:
+                raise ConflictError(conflicts)
+
+    def _add_periods(self, sql, rows):
+        rows = list(rows)
+        try:
+            with self.transaction():
+                self.conn.executemany(sql, rows)
+        except sqlite3.IntegrityError:
+            # Людину, якій додається період, тим часом видалив інший користувач
+            person_ids = list({row[0] for row in rows})
+            existing = {person.id for person in people_by_ids(self.conn, person_ids)}
+            missing = [person_id for person_id in person_ids if person_id not in existing]
+            if not missing:
+                raise
+            raise ConflictError([{"table": "people", "id": person_id, "deleted": True} for person_id in missing])
+
+    def load_people(self):
+        return load_people(self.conn)
+
+    def people_by_ids(self, person_ids):
+        return people_by_ids(self.conn, list(person_ids))
+
+    def load_service_periods(self):
+        return load_service_periods(self.conn)
+
+    def load_preference_periods(self):
+        return load_preference_periods(self.conn)
+
+    def load_totals(self):
+        return load_totals(self.conn)
+
+    def periods_for(self, person_ids):
+        return load_periods_for(self.conn, person_ids)
+
+    def add_person(self, info) -> int:
+        with self.transaction():
+            curs = self.conn.execute(SQL_INSERT_PERSON, (
+                info["rank"], info["sec_name"], info["name"], info["unit"], info["note"]
+            ))
+        return curs.lastrowid
+
+    def update_person(self, person_id, info, version):
+        self._versioned("people", SQL_UPDATE_PERSON, [(
+            info["rank"], info["sec_name"], info["name"], info["unit"], info["note"], person_id, version
+        )])
+
+    def delete_people(self, people):
+        # people - пари (id, версія)
+        self._versioned("people", SQL_DELETE_PERSON, [tuple(person) for person in people])
+
+    def add_service_period(self, person_id, start, end):
+        self._add_periods(SQL_INSERT_CAL, [(person_id, start, end)])
+
+    def add_preference_period(self, person_id, start, end, pref_type):
+        self._add_periods(SQL_INSERT_PREF, [(person_id, start, end, pref_type)])
+
+    def add_service_periods(self, rows):
+        self._add_periods(SQL_INSERT_CAL, rows)
+
+    def add_preference_periods(self, rows):
+        self._add_periods(SQL_INSERT_PREF, rows)
+
+    def person_service_period_rows(self, person_id):
+        return self.conn.execute(SQL_PERSON_CAL_ROWS, (person_id,)).fetchall()
+
+    def person_preference_period_rows(self, person_id):
+        return self.conn.execute(SQL_PERSON_PREF_ROWS, (person_id,)).fetchall()
+
+    def update_service_period(self, period_id, new, version):
+        self._versioned("service_periods", SQL_UPDATE_CAL, [(*new, period_id, version)])
+
+    def update_preference_period(self, period_id, new, version):
+        self._versioned("preferenced_periods", SQL_UPDATE_PREF, [(*new, period_id, version)])
+
+    def delete_service_periods(self, periods):
+        # periods - пари (id, версія)
+        self._versioned("service_periods", SQL_DELETE_CAL, [tuple(period) for period in periods])
+
+    def delete_preference_periods(self, periods):
+        self._versioned("preferenced_periods", SQL_DELETE_PREF, [tuple(period) for period in periods])
+
+    def last_change(self) -> int:
+        return self.conn.execute("SELECT coalesce(max(seq), 0) FROM change_journal").fetchone()[0]
+
+    def last_exported_change(self) -> int:
+        return self.conn.execute("SELECT coalesce(max(seq), 0) FROM change_exports").fetchone()[0]
+
+    def changed_people(self, since, last) -> list[int]:
+        # Id людей, що існують і змінювалися у проміжку номерів журналу (since, last]
+        return [row[0] for row in self.conn.execute(
+            "SELECT id FROM people WHERE id IN (SELECT person_id FROM change_journal WHERE seq > ? AND seq <= ?)",
+            (since, last)
+        )]
+
+    def save_change_export(self, seq, path):
+        with self.transaction():
+            self.conn.execute("INSERT INTO change_exports (seq, path) VALUES (?, ?)", (seq, path))
+
+    def save_totals(self, rows):
+        with self.transaction():
+            self.conn.executemany(SQL_SAVE_TOTALS, rows)
@@ -0,0 +1,218 @@
+# Ця програма входить до проєкту Вислуга років
+# Обчислює календарну та пільгову вислугу (правило 30/360) для всіх людей одним проходом NumPy, без Qt
+
+from datetime import date
+from functools import lru_cache
+import numpy as np
+from visluga_db import CIVIL_EDU, PREF_TYPES
+
+COEFFS = {
+    "1 день/3 дні": 3.0,
+    "1 день/2 дні": 2.0,
+    "1 день/1,5 дні": 1.5,
+    "30 днів/40 днів": 1.33,
+    CIVIL_EDU: 0.5
+}
+DAY_COEFFS = (1.5, 1.33, 0.5)
+MAX_CIVIL = (2, 6, 0)
+# У масивах NumPy відкритий кінець періоду (end_day IS NULL) позначається нулем
+OPEN_END = 0
+# Збільшується при зміні правил підрахунку - тоді всі збережені підсумки стають застарілими
+TOTALS_VERSION = 1
+_PREF_CODES = {pref_type: code for code, pref_type in enumerate(PREF_TYPES, start=1)}
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+@lru_cache(maxsize=None)
+def format_ymd(y, m, d) -> str:
+    return f"{y} р. {m} м. {d} д."
+
+def split_ordinals(ordinals):
+    days = (np.asarray(ordinals, dtype=np.int64) - _EPOCH).astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    y = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    m = months.astype(np.int64) % 12 + 1
+    d = (days - months).astype(np.int64) + 1
+    return y, m, d
+
+def _ymd_diff(sy, sm, sd, ends):
+    ey, em, ed = split_ordinals(ends)
+    years, months, days = ey - sy, em - sm, ed - sd
+
+    borrow = days < 0
+    months -= borrow
+    days += 30 * borrow
+
+    borrow = months < 0
+    years -= borrow
+    months += 12 * borrow
+
+    return years, months, days
+
+def normalize_arrays(y, m, d):
+    carry = d >= 30
+    m = m + carry
+    d = d - 30 * carry
+    carry = m >= 12
+    return y + carry, m - 12 * carry, d
+
+def _group_sum(index, count, *columns):
+    return [np.bincount(index, weights=column, minlength=count).astype(np.int64) for column in columns]
+
+def _person_index(person_ids, period_ids):
+    period_ids = np.asarray(period_ids, dtype=np.int64)
+    order = np.argsort(person_ids, kind="stable")
+    sorted_ids = person_ids[order]
+    pos = np.searchsorted(sorted_ids, period_ids)
+    pos = np.minimum(pos, max(len(sorted_ids) - 1, 0))
+    known = sorted_ids[pos] == period_ids if len(sorted_ids) else np.zeros(len(period_ids), dtype=bool)
+    return order[pos[known]], known
+
+class TotalsIndex:
+    # Періоди, розкладені по масивах один раз: індекс людини, (р, м, д) початку, коефіцієнти пільг.
+    # Для кожної нової дати рахуються лише кінці періодів, тому серія дат обходиться дешево.
+    def __init__(self, person_ids, cal_ids, cal_starts, cal_ends, pref_ids, pref_starts, pref_ends, pref_types):
+        person_ids = np.asarray(person_ids, dtype=np.int64)
+        self.count = len(person_ids)
+
+        self.cal_index, known = _person_index(person_ids, cal_ids)
+        self.cal_starts = np.asarray(cal_starts, dtype=np.int64)[known]
+        self.cal_ends = np.asarray(cal_ends, dtype=np.int64)[known]
+        self.cal_split = split_ordinals(self.cal_starts)
+
+        self.pref_index, known = _person_index(person_ids, pref_ids)
+        pref_types = np.asarray(pref_types, dtype=object)[known]
+        self.pref_starts = np.asarray(pref_starts, dtype=np.int64)[known]
+        self.pref_ends = np.asarray(pref_ends, dtype=np.int64)[known]
+        self.pref_split = split_ordinals(self.pref_starts)
+        self.coeff = np.array([COEFFS.get(ptype, 1.0) for ptype in pref_types], dtype=np.float64)
+        self.civil = pref_types == CIVIL_EDU
+        self.by_days = np.isin(self.coeff, DAY_COEFFS)
+
+    @classmethod
+    def for_people(cls, person_ids, cal_periods, pref_periods):
+        cal_rows = [(person_id, start, end) for person_id in person_ids for start, end in cal_periods.get(person_id, ())]
+        pref_rows = [
+            (person_id, start, end, ptype)
+            for person_id in person_ids for start, end, ptype in pref_periods.get(person_id, ())
+        ]
+        return cls(
+            person_ids,
+            [row[0] for row in cal_rows],
+            [row[1] for row in cal_rows],
+            [OPEN_END if row[2] is None else row[2] for row in cal_rows],
+            [row[0] for row in pref_rows],
+            [row[1] for row in pref_rows],
+            [OPEN_END if row[2] is None else row[2] for row in pref_rows],
+            [row[3] for row in pref_rows],
+        )
+
+    def _periods_ymd(self, split, starts, ends, day, clip):
+        ends = np.where(ends == OPEN_END, day, ends)
+        if not clip:
+            return _ymd_diff(*split, ends)
+        # Стан на дату: періоди обрізаються цією датою, ще не розпочаті не враховуються
+        active = starts <= day
+        y, m, d = _ymd_diff(*split, np.minimum(ends, day))
+        return y * active, m * active, d * active
+
+    def totals(self, day=None, clip=False):
+        # day - одна дата для всіх або масив дат, по одній на кожну людину індексу
+        if day is None:
+            day = date.today().toordinal()
+        count = self.count
+        per_person = np.ndim(day) > 0
+
+        cal_day = day[self.cal_index] if per_person else day
+        y, m, d = self._periods_ymd(self.cal_split, self.cal_starts, self.cal_ends, cal_day, clip)
+        total_y, total_m, total_d = _group_sum(self.cal_index, count, y, m, d)
+
+        pref_day = day[self.pref_index] if per_person else day
+        y, m, d = self._periods_ymd(self.pref_split, self.pref_starts, self.pref_ends, pref_day, clip)
+        coeff = self.coeff
+        by_days = self.by_days
+        civil = self.civil
+        converted = ((y * 360 + m * 30 + d) * coeff).astype(np.int64)
+        py = np.where(by_days, converted // 360, (y * coeff).astype(np.int64))
+        pm = np.where(by_days, (converted % 360) // 30, (m * coeff).astype(np.int64))
+        pd = np.where(by_days, (converted % 360) % 30, (d * coeff).astype(np.int64))
+        py, pm, pd = normalize_arrays(py, pm, pd)
+
+        civil_y, civil_m, civil_d = _group_sum(self.pref_index, count, py * civil, pm * civil, pd * civil)
+        pref_y, pref_m, pref_d = _group_sum(self.pref_index, count, py * ~civil, pm * ~civil, pd * ~civil)
+
+        # Навчання у цивільному ВНЗ зараховується не більше ніж 2 р. 6 м. (порівняння кортежів, як у (р, м, д) > MAX_CIVIL)
+        max_y, max_m, max_d = MAX_CIVIL
+        over = (civil_y > max_y) | ((civil_y == max_y) & ((civil_m > max_m) | ((civil_m == max_m) & (civil_d > max_d))))
+        civil_y = np.where(over, max_y, civil_y)
+        civil_m = np.where(over, max_m, civil_m)
+        civil_d = np.where(over, max_d, civil_d)
+
+        cal = normalize_arrays(total_y + civil_y, total_m + civil_m, total_d + civil_d)
+        pref = normalize_arrays(cal[0] + pref_y, cal[1] + pref_m, cal[2] + pref_d)
+        return np.stack(cal, axis=1), np.stack(pref, axis=1)
+
+    def formatted(self, day=None, clip=False) -> list[tuple[str, str]]:
+        cal, pref = self.totals(day, clip)
+        return [(format_ymd(*cal_row), format_ymd(*pref_row)) for cal_row, pref_row in zip(cal.tolist(), pref.tolist())]
+
+def compute_totals(person_ids, cal_ids, cal_starts, cal_ends,
+                   pref_ids, pref_starts, pref_ends, pref_types, today=None):
+    index = TotalsIndex(person_ids, cal_ids, cal_starts, cal_ends, pref_ids, pref_starts, pref_ends, pref_types)
+    return index.totals(today)
+
+def totals_for_people(person_ids, cal_periods, pref_periods, today=None) -> list[tuple[str, str]]:
+    return TotalsIndex.for_people(person_ids, cal_periods, pref_periods).formatted(today)
+
+def totals_as_of(db, days, person_ids=None) -> dict[int, dict]:
+    # Вислуга всіх (або вибраних) людей станом на кожну з дат days (номери днів); у service_totals не пишеться
+    if person_ids is None:
+        person_ids = [row[0] for row in db.conn.execute("SELECT id FROM people")]
+    index = TotalsIndex.for_people(person_ids, db.load_service_periods(), db.load_preference_periods())
+    return {day: dict(zip(person_ids, index.formatted(day, clip=True))) for day in days}
+
+def periods_fingerprint(cal, pref) -> int:
+    # hash() кортежу цілих стабільний між запусками (на відміну від рядків і None), тому тут лише числа
+    return hash((
+        TOTALS_VERSION,
+        tuple((start, end or OPEN_END) for start, end in cal),
+        tuple((start, end or OPEN_END, _PREF_CODES.get(pref_type, 0)) for start, end, pref_type in pref),
+    ))
+
+def totals_with_cache(person_ids, cal_periods, pref_periods, cached, today=None):
+    # Повертає (підсумки в порядку person_ids, рядки для save_totals лише для перерахованих).
+    # Запис кешу дійсний, якщо періоди не змінилися, а для періодів "по т.ч." - ще й якщо він сьогоднішній.
+    if today is None:
+        today = date.today().toordinal()
+    results = {}
+    stale = []
+    fingerprints = {}
+    for person_id in person_ids:
+        cal = cal_periods.get(person_id, ())
+        pref = pref_periods.get(person_id, ())
+        fingerprint = fingerprints[person_id] = periods_fingerprint(cal, pref)
+        row = cached.get(person_id)
+        if row is not None and row[3] == fingerprint and (
+            row[2] == today
+            or all(end is not None for _, end in cal) and all(end is not None for _, end, _ in pref)
+        ):
+            results[person_id] = (row[0], row[1])
+        else:
+            stale.append(person_id)
+
+    rows = []
+    for person_id, totals in zip(stale, totals_for_people(stale, cal_periods, pref_periods, today)):
+        results[person_id] = totals
+        rows.append((person_id, *totals, today, fingerprints[person_id]))
+    return [results[person_id] for person_id in person_ids], rows
+
+def recompute_totals(db, person_ids=None, today=None, use_cache=False) -> dict:
+    if person_ids is None:
+        person_ids = [row[0] for row in db.conn.execute("SELECT id FROM people")]
+        cal_periods, pref_periods = db.load_service_periods(), db.load_preference_periods()
+    else:
+        cal_periods, pref_periods = db.periods_for(person_ids)
+    cached = db.load_totals() if use_cache else {}
+    results, rows = totals_with_cache(person_ids, cal_periods, pref_periods, cached, today)
+    db.save_totals(rows)
+    return dict(zip(person_ids, results))
@@ -0,0 +1,126 @@
+# Ця програма входить до проєкту Вислуга років
+# Відповідає за потоковий експорт бази у Excel: рядки йдуть прямо з курсора SQLite, пам'ять не зростає.
+# Експорт змін бере з журналу (change_journal) лише людей, змінених після заданого номера.
+
+import csv
+from visluga_db import format_cal_periods, format_pref_periods
+
+HEADERS = ["№", "Військове звання", "Прізвище", "Ім'я\nПо батькові", "Підрозділ",
+           "Календарна вислуга років", "Пільгова вислуга років", "Періоди військової служби",
+           "Пільгові періоди служби", "Навчання в цивільному ВНЗ", "Примітка"]
+CHANGE_HEADERS = ["Номер зміни", "id", "Дія"] + HEADERS[1:]
+PROGRESS_STEP = 500
+# Умова відбору людей, змінених у проміжку номерів журналу (since, last]
+CHANGED_PEOPLE = " WHERE {} IN (SELECT person_id FROM change_journal WHERE seq > ? AND seq <= ?)"
+
+def _grouped(cursor):
+    # Курсор відсортований за person_id; повертає (person_id, [рядки без person_id]) по черзі
+    row = next(cursor, None)
+    while row is not None:
+        person_id = row[0]
+        group = []
+        while row is not None and row[0] == person_id:
+            group.append(row[1:])
+            row = next(cursor, None)
+        yield person_id, group
+
+def _periods_for(groups, current, person_id):
+    while current is not None and current[0] < person_id:
+        current = next(groups, None)
+    if current is not None and current[0] == person_id:
+        return current[1], next(groups, None)
+    return (), current
+
+def count_people(conn) -> int:
+    return conn.execute("SELECT count(*) FROM people").fetchone()[0]
+
+def _person_rows(conn, where="", params=()):
+    # (person_id, рядок без номера) для людей, відібраних умовою where ("{}" - колонка з id людини)
+    people = conn.execute(f"""
+        SELECT p.id, p.rank, p.sec_name, p.name, p.unit, p.note, t.calendar_years, t.preferenced_years
+        FROM people p LEFT JOIN service_totals t ON t.person_id = p.id
+        {where.format("p.id")}
+        ORDER BY p.id
+    """, params)
+    cal_groups = _grouped(conn.execute(
+        f"SELECT person_id, start_day, end_day FROM service_periods {where.format('person_id')} "
+        "ORDER BY person_id, id", params
+    ))
+    pref_groups = _grouped(conn.execute(
+        f"SELECT person_id, start_day, end_day, preference_type FROM preferenced_periods {where.format('person_id')} "
+        "ORDER BY person_id, id", params
+    ))
+    cal_current = next(cal_groups, None)
+    pref_current = next(pref_groups, None)
+
+    for person_id, rank, sec_name, name, unit, note, cal_years, pref_years in people:
+        cal_periods, cal_current = _periods_for(cal_groups, cal_current, person_id)
+        pref_periods, pref_current = _periods_for(pref_groups, pref_current, person_id)
+        general, civil = format_pref_periods(pref_periods)
+        yield person_id, [
+            rank, sec_name, name, unit, cal_years or "", pref_years or "",
+            format_cal_periods(cal_periods), general, civil, note or ""
+        ]
+
+def iter_export_rows(conn):
+    for number, (_, row) in enumerate(_person_rows(conn), start=1):
+        yield [str(number), *row]
+
+def iter_change_rows(conn, since, last):
+    # Один рядок на кожну людину, змінену після номера since: поточний стан або "видалено".
+    # Люди, додані й видалені в межах того самого проміжку, не потрапляють у експорт зовсім.
+    changes = conn.execute("""
+        SELECT person_id, max(seq), max(table_name = 'people' AND operation = 'insert')
+        FROM change_journal WHERE seq > ? AND seq <= ?
+        GROUP BY person_id ORDER BY person_id
+    """, (since, last))
+    rows = _person_rows(conn, CHANGED_PEOPLE, (since, last))
+    current = next(rows, None)
+    for person_id, seq, added in changes:
+        while current is not None and current[0] < person_id:
+            current = next(rows, None)
+        if current is not None and current[0] == person_id:
+            yield [seq, person_id, "додано" if added else "змінено", *current[1]]
+        elif not added:
+            yield [seq, person_id, "видалено"] + [""] * (len(CHANGE_HEADERS) - 3)
+
+def append_header(ws, titles):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    header = []
+    for title in titles:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+
+def export_to_csv(output_path, rows, headers=HEADERS):
+    # Крапка з комою і BOM - Excel відкриває такий файл напряму
+    with open(output_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+def export_to_xlsx(output_path, rows, progress=None, is_cancelled=None, headers=HEADERS) -> bool:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Вислуга років")
+    append_header(ws, headers)
+
+    written = 0
+    for row in rows:
+        ws.append(row)
+        written += 1
+        if written % PROGRESS_STEP == 0:
+            if is_cancelled is not None and is_cancelled():
+                wb.close()
+                return False
+            if progress is not None:
+                progress(written)
+
+    if progress is not None:
+        progress(written)
+    wb.save(output_path)
+    return True
@@ -0,0 +1,80 @@
+# Ця програма входить до проєкту Вислуга років
+# Прогноз ювілейних дат вислуги: коли кожна людина досягне 10/20/25 років календарної і пільгової вислуги.
+# Дати рахуються один раз і зберігаються відсортованими, тож запит "найближчі N днів" - це пошук діапазону.
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+import numpy as np
+from visluga_engine import TotalsIndex
+
+MILESTONES = (10, 20, 25)
+KINDS = ("Календарна", "Пільгова")
+# Найдовший горизонт прогнозу; далі дати не шукаються
+HORIZON_DAYS = 40 * 366
+
+def _total_days(ymd):
+    return ymd[:, 0] * 360 + ymd[:, 1] * 30 + ymd[:, 2]
+
+def crossing_days(index, years, today, horizon=HORIZON_DAYS):
+    # Для кожної людини індексу - перший день після today, коли вислуга досягає years років (за 30/360),
+    # або 0, якщо цього не станеться в межах горизонту чи вже сталося. Вислуга з часом не зменшується,
+    # тому пошук двійковий, одночасно для всіх людей.
+    target = years * 360
+    found = []
+    now_cal, now_pref = index.totals(today, clip=True)
+    end_cal, end_pref = index.totals(today + horizon, clip=True)
+    for kind in range(len(KINDS)):
+        now = _total_days((now_cal, now_pref)[kind])
+        later = _total_days((end_cal, end_pref)[kind])
+        pending = (now < target) & (later >= target)
+        lo = np.full(index.count, today, dtype=np.int64)
+        hi = np.full(index.count, today + horizon, dtype=np.int64)
+        while np.any(pending & (hi - lo > 1)):
+            mid = (lo + hi) // 2
+            reached = _total_days(index.totals(mid, clip=True)[kind]) >= target
+            hi = np.where(pending & reached, mid, hi)
+            lo = np.where(pending & ~reached, mid, lo)
+        found.append(np.where(pending, hi, 0))
+    return found
+
+class MilestoneIndex:
+    def __init__(self):
+        self.today = None
+        # Відсортовані записи (день, person_id, вид вислуги, роки)
+        self.entries = []
+
+    def build(self, person_ids, cal_periods, pref_periods, today=None):
+        self.today = date.today().toordinal() if today is None else today
+        self.entries = sorted(self._entries(person_ids, cal_periods, pref_periods))
+
+    def update(self, person_ids, cal_periods, pref_periods):
+        # Після зміни періодів кількох людей: їхні записи прибираються і рахуються заново
+        changed = set(person_ids)
+        self.entries = [entry for entry in self.entries if entry[1] not in changed]
+        for entry in self._entries(list(changed), cal_periods, pref_periods):
+            insort(self.entries, entry)
+
+    def _entries(self, person_ids, cal_periods, pref_periods):
+        # Людей без відкритих чи майбутніх періодів вислуга вже не зміниться - їх пропускаємо
+        person_ids = [
+            person_id for person_id in person_ids
+            if any(end is None or end > self.today for _, end in cal_periods.get(person_id, ()))
+            or any(end is None or end > self.today for _, end, _ in pref_periods.get(person_id, ()))
+        ]
+        if not person_ids:
+            return []
+        index = TotalsIndex.for_people(person_ids, cal_periods, pref_periods)
+        entries = []
+        for years in MILESTONES:
+            for kind, days in zip(KINDS, crossing_days(index, years, self.today)):
+                entries.extend(
+                    (int(day), person_ids[i], kind, years) for i, day in enumerate(days.tolist()) if day
+                )
+        return entries
+
+    def upcoming(self, days, start=None):
+        # Хто досягне порогу в проміжку (start, start + days]; start - номер дня, типово сьогодні
+        start = self.today if start is None else start
+        first = bisect_right(self.entries, (start, float("inf")))
+        last = bisect_left(self.entries, (start + days + 1,))
+        return self.entries[first:last]
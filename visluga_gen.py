@@ -0,0 +1,116 @@
+# Ця програма входить до проєкту Вислуга років
+# Генерує правдоподібні тестові бази (люди, календарні та пільгові періоди) заданого розміру
+
+import argparse, os, random, sqlite3
+from datetime import date, timedelta
+from visluga_db import RANKS, UNITS, PREF_TYPES, CIVIL_EDU, init_db
+
+SURNAMES = ["Шевченко", "Коваленко", "Бондаренко", "Ткаченко", "Кравченко", "Олійник", "Шевчук", "Поліщук",
+            "Бойко", "Ткачук", "Мельник", "Петренко", "Савчук", "Руденко", "Мороз", "Марченко", "Лисенко",
+            "Гончаренко", "Кравчук", "Павленко", "Клименко", "Левченко", "Костенко", "Зінченко", "Гаврилюк"]
+FIRST_NAMES = ["Олександр", "Андрій", "Сергій", "Володимир", "Дмитро", "Іван", "Микола", "Юрій", "Олег",
+               "Віталій", "Максим", "Богдан", "Тарас", "Роман", "Ярослав", "Ольга", "Наталія", "Ірина"]
+PATRONYMICS = ["Олександрович", "Андрійович", "Сергійович", "Володимирович", "Іванович", "Миколайович",
+               "Петрович", "Васильович", "Олексійович", "Михайлович"]
+DEFAULT_PREF_MIX = {"1 день/3 дні": 0.45, "1 день/2 дні": 0.1, "1 день/1,5 дні": 0.2, "30 днів/40 днів": 0.25}
+
+def parse_mix(text) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.rpartition("=")
+        if name.strip() not in PREF_TYPES or name.strip() == CIVIL_EDU:
+            raise ValueError(f"невідомий тип пільги '{name.strip()}'")
+        mix[name.strip()] = float(weight)
+    return mix
+
+def random_day(rng, first, last) -> date:
+    return date.fromordinal(rng.randint(first.toordinal(), last.toordinal()))
+
+def person_periods(rng, today, cal_count, pref_count, now_share, pref_mix, civil_share):
+    cal = []
+    start = random_day(rng, date(1990, 1, 1), today - timedelta(days=400))
+    for i in range(cal_count):
+        if start >= today:
+            break
+        last = i == cal_count - 1
+        if last and rng.random() < now_share:
+            cal.append((start, None))
+            break
+        end = min(today, start + timedelta(days=rng.randint(180, 3650)))
+        cal.append((start, end))
+        start = end + timedelta(days=rng.randint(1, 700))
+
+    pref = []
+    types = list(pref_mix)
+    weights = [pref_mix[t] for t in types]
+    for _ in range(pref_count):
+        if not cal:
+            break
+        cal_start, cal_end = rng.choice(cal)
+        pref_start = random_day(rng, cal_start, cal_end or today)
+        if cal_end is None and rng.random() < now_share:
+            pref_end = None
+        else:
+            pref_end = random_day(rng, pref_start, cal_end or today).toordinal()
+        pref.append((pref_start.toordinal(), pref_end, rng.choices(types, weights)[0]))
+
+    if cal and rng.random() < civil_share:
+        service_start = cal[0][0]
+        study_start = service_start - timedelta(days=rng.randint(4 * 365, 6 * 365))
+        pref.append((study_start.toordinal(), service_start.toordinal() - 1, CIVIL_EDU))
+
+    return [(s.toordinal(), e and e.toordinal()) for s, e in cal], pref
+
+def generate(path, people=1000, cal_periods=3, pref_periods=1, now_share=0.3,
+             pref_mix=None, civil_share=0.15, seed=1) -> dict:
+    if os.path.exists(path):
+        os.remove(path)
+    init_db(path)
+
+    rng = random.Random(seed)
+    today = date.today()
+    pref_mix = pref_mix or DEFAULT_PREF_MIX
+
+    people_rows = []
+    cal_rows = []
+    pref_rows = []
+    for person_id in range(1, people + 1):
+        people_rows.append((
+            person_id, rng.choice(RANKS), rng.choice(SURNAMES),
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(PATRONYMICS)}", rng.choice(UNITS), ""
+        ))
+        cal, pref = person_periods(
+            rng, today, rng.randint(1, cal_periods), rng.randint(0, pref_periods), now_share, pref_mix, civil_share
+        )
+        cal_rows.extend((person_id, *period) for period in cal)
+        pref_rows.extend((person_id, *period) for period in pref)
+
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO people (id, rank, sec_name, name, unit, note) VALUES (?, ?, ?, ?, ?, ?)", people_rows)
+    conn.executemany("INSERT INTO service_periods (person_id, start_day, end_day) VALUES (?, ?, ?)", cal_rows)
+    conn.executemany(
+        "INSERT INTO preferenced_periods (person_id, start_day, end_day, preference_type) VALUES (?, ?, ?, ?)",
+        pref_rows
+    )
+    conn.commit()
+    conn.close()
+    return {"people": len(people_rows), "service_periods": len(cal_rows), "preferenced_periods": len(pref_rows)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор тестових баз для програми 'Вислуга років'")
+    parser.add_argument("path")
+    parser.add_argument("--people", type=int, default=1000)
+    parser.add_argument("--cal-periods", type=int, default=3, help="максимум календарних періодів на людину")
+    parser.add_argument("--pref-periods", type=int, default=1, help="максимум пільгових періодів на людину")
+    parser.add_argument("--now-share", type=float, default=0.3, help="частка періодів 'по т.ч.'")
+    parser.add_argument("--civil-share", type=float, default=0.15, help="частка людей з навчанням у цивільному ВНЗ")
+    parser.add_argument("--pref-mix", type=parse_mix, default=None, help="напр. '1 день/3 дні=0.7,30 днів/40 днів=0.3'")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    counts = generate(args.path, args.people, args.cal_periods, args.pref_periods,
+                      args.now_share, args.pref_mix, args.civil_share, args.seed)
+    print(f"Створено {args.path}: {counts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# Ця програма входить до проєкту Вислуга років
+# Відповідає за масовий імпорт людей і періодів служби з Excel/CSV (у тому числі з файлів експорту програми)
+
+import codecs, csv, os, re, time, zipfile
+from datetime import datetime
+from visluga_db import RANKS, UNITS, PREF_TYPES, CIVIL_EDU
+from visluga_export import HEADERS
+
+FIELDS = {
+    "Військове звання": "rank",
+    "Прізвище": "sec_name",
+    "Ім'я По батькові": "name",
+    "Підрозділ": "unit",
+    "Примітка": "note",
+    "Періоди військової служби": "cal_periods",
+    "Пільгові періоди служби": "pref_periods",
+    "Навчання в цивільному ВНЗ": "civil_edu",
+}
+OPEN_END_TEXTS = ("по т.ч.", "NOW")
+PERIOD_RE = re.compile(r"^\s*(\S+)\s+-\s+(.+?)\s*(?:\((.+)\))?\s*$")
+# CSV, збережений Excel у кирилиці Windows ("CSV (розділювачі - коми)"), - не UTF-8
+CSV_ENCODINGS = ("utf-8-sig", "cp1251")
+
+class ImportValidationError(Exception):
+    def __init__(self, errors):
+        super().__init__(f"Файл містить помилки: {len(errors)}")
+        self.errors = errors
+
+def _header_key(title) -> str:
+    return " ".join(str(title or "").split())
+
+def csv_encoding(path) -> str:
+    # Перше з CSV_ENCODINGS, яким декодується весь файл; файл читається частинами, а не цілком у пам'ять
+    for encoding in CSV_ENCODINGS[:-1]:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        with open(path, "rb") as f:
+            try:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    decoder.decode(chunk)
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                continue
+        return encoding
+    return CSV_ENCODINGS[-1]
+
+def read_rows(path):
+    # Файл, який не вдається прочитати (кодування, пошкоджений .xlsx), - теж помилка імпорту, а не збій програми
+    if path.lower().endswith(".csv"):
+        try:
+            with open(path, newline="", encoding=csv_encoding(path)) as f:
+                sample = f.read(4096)
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+                except csv.Error:
+                    dialect = csv.excel
+                yield from csv.reader(f, dialect)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise ImportValidationError([f"Не вдалося прочитати файл CSV: {e}"])
+    else:
+        from xml.etree.ElementTree import ParseError
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        try:
+            wb = load_workbook(path, read_only=True, data_only=True)
+            try:
+                yield from wb.worksheets[0].iter_rows(values_only=True)
+            finally:
+                wb.close()
+        except (OSError, zipfile.BadZipFile, InvalidFileException, KeyError, ParseError) as e:
+            raise ImportValidationError([f"Файл не є книгою Excel (.xlsx) або пошкоджений: {e}"])
+
+def parse_date(text, allow_open=False):
+    # Повертає номер дня (date.toordinal()); відкритий кінець періоду - None
+    text = text.strip()
+    if allow_open and text in OPEN_END_TEXTS:
+        return None
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).toordinal()
+        except ValueError:
+            pass
+    raise ValueError(f"невірна дата '{text}'")
+
+def parse_periods(cell, with_type=False, default_type=None):
+    periods = []
+    for line in str(cell or "").splitlines():
+        if not line.strip():
+            continue
+        match = PERIOD_RE.match(line)
+        if not match:
+            raise ValueError(f"невірний період '{line.strip()}'")
+        start = parse_date(match.group(1))
+        end = parse_date(match.group(2), allow_open=True)
+        if end is not None and end < start:
+            raise ValueError(f"кінець періоду раніше за початок: '{line.strip()}'")
+
+        pref_type = match.group(3) or default_type
+        if with_type:
+            if pref_type not in PREF_TYPES:
+                raise ValueError(f"невідомий тип пільги '{pref_type}'")
+            periods.append((start, end, pref_type))
+        else:
+            periods.append((start, end))
+    return periods
+
+def parse_file(path):
+    rows = read_rows(path)
+    header = next(rows, None)
+    if header is None:
+        raise ImportValidationError(["Файл порожній"])
+
+    columns = {FIELDS[_header_key(title)]: i for i, title in enumerate(header) if _header_key(title) in FIELDS}
+    if "sec_name" not in columns:
+        known = ", ".join(title.replace("\n", " ") for title in HEADERS if _header_key(title) in FIELDS)
+        raise ImportValidationError([f"У першому рядку немає заголовка 'Прізвище'. Очікувані колонки: {known}"])
+
+    people = []
+    errors = []
+    for line_number, row in enumerate(rows, start=2):
+        values = {field: str(row[i]).strip() if i < len(row) and row[i] is not None else ""
+                  for field, i in columns.items()}
+        if not any(values.values()):
+            continue
+
+        try:
+            if not values["sec_name"]:
+                raise ValueError("порожнє прізвище")
+            if values.get("rank", "") not in RANKS:
+                raise ValueError(f"невідоме військове звання '{values.get('rank', '')}'")
+            if values.get("unit", "") not in UNITS:
+                raise ValueError(f"невідомий підрозділ '{values.get('unit', '')}'")
+            person = {
+                "rank": values["rank"],
+                "sec_name": values["sec_name"],
+                "name": values.get("name", ""),
+                "unit": values["unit"],
+                "note": values.get("note", ""),
+                "cal_periods": parse_periods(values.get("cal_periods")),
+                "pref_periods": parse_periods(values.get("pref_periods"), with_type=True)
+                                + parse_periods(values.get("civil_edu"), with_type=True, default_type=CIVIL_EDU),
+            }
+        except ValueError as e:
+            errors.append(f"Рядок {line_number}: {e}")
+            continue
+        people.append(person)
+
+    if errors:
+        raise ImportValidationError(errors)
+    return people
+
+def import_people(db, people) -> list[int]:
+    with db.transaction() as conn:
+        last_id = conn.execute("SELECT coalesce(max(id), 0) FROM people").fetchone()[0]
+        conn.executemany(
+            "INSERT INTO people (rank, sec_name, name, unit, note) VALUES (?, ?, ?, ?, ?)",
+            ((p["rank"], p["sec_name"], p["name"], p["unit"], p["note"]) for p in people)
+        )
+        # AUTOINCREMENT видає нові id за зростанням, тому порядок id збігається з порядком вставки
+        person_ids = [row[0] for row in conn.execute("SELECT id FROM people WHERE id > ? ORDER BY id", (last_id,))]
+
+        conn.executemany(
+            "INSERT INTO service_periods (person_id, start_day, end_day) VALUES (?, ?, ?)",
+            ((person_id, *period) for person_id, p in zip(person_ids, people) for period in p["cal_periods"])
+        )
+        conn.executemany(
+            "INSERT INTO preferenced_periods (person_id, start_day, end_day, preference_type) VALUES (?, ?, ?, ?)",
+            ((person_id, *period) for person_id, p in zip(person_ids, people) for period in p["pref_periods"])
+        )
+    return person_ids
+
+def import_file(db, path, recompute=True) -> dict:
+    started = time.perf_counter()
+    people = parse_file(path)
+    person_ids = import_people(db, people)
+    if recompute:
+        from visluga_engine import recompute_totals
+        recompute_totals(db, person_ids)
+
+    seconds = time.perf_counter() - started
+    periods = sum(len(p["cal_periods"]) + len(p["pref_periods"]) for p in people)
+    return {
+        "file": os.path.basename(path),
+        "people": len(person_ids),
+        "periods": periods,
+        "seconds": seconds,
+        "rows_per_second": (len(person_ids) + periods) / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,103 @@
+# Ця програма входить до проєкту Вислуга років
+# Пошук і об'єднання періодів, що перетинаються (сортування + один прохід), для однієї людини і для всієї бази
+
+from datetime import date
+from visluga_db import format_day
+
+# Відкритий період "по т.ч." при порівнянні вважається нескінченним
+OPEN_DAY = date.max.toordinal()
+
+TABLES = {
+    # таблиця: (назва для звіту, стовпці групи, в межах якої шукаються перетини)
+    "service_periods": ("Календарні", "person_id"),
+    # Пільги різних типів мають різні коефіцієнти, тому перетином вважаються лише періоди одного типу
+    "preferenced_periods": ("Пільгові", "person_id, preference_type"),
+}
+
+def _end(end):
+    return OPEN_DAY if end is None else end
+
+def sweep(periods):
+    # periods - (id, початок, кінець), відсортовані за початком.
+    # Повертає групи id, що перетинаються між собою (ланцюжком), та об'єднаний період кожної групи.
+    # Періоди, що лише торкаються (кінець одного = початок іншого), не перетинаються: дні не рахуються двічі.
+    groups = []
+    group = []
+    group_start = group_end = None
+    for period_id, start, end in periods:
+        if group and start < _end(group_end):
+            group.append(period_id)
+            if _end(end) > _end(group_end):
+                group_end = end
+            continue
+        if len(group) > 1:
+            groups.append((group, group_start, group_end))
+        group = [period_id]
+        group_start, group_end = start, end
+    if len(group) > 1:
+        groups.append((group, group_start, group_end))
+    return groups
+
+def overlapping(periods, start, end):
+    # Перевірка нового періоду проти вже внесених (id, start, end[, тип]) однієї людини
+    return [period for period in periods if period[1] < _end(end) and start < _end(period[2])]
+
+def union(periods):
+    # Спільний період для (start, end[, тип]), що перетинаються
+    start = min(period[0] for period in periods)
+    end = max(_end(period[1]) for period in periods)
+    return start, None if end == OPEN_DAY else end
+
+def audit(conn, person_ids=None):
+    # Один прохід по кожній таблиці у порядку індексу (person_id, start_day): сортування робить SQLite
+    found = []
+    for table, (title, group_columns) in TABLES.items():
+        rows = conn.execute(
+            f"SELECT id, row_version, {group_columns}, start_day, end_day FROM {table} ORDER BY {group_columns}, start_day"
+        )
+        key = None
+        periods = []
+        versions = {}
+        for row in rows:
+            if row[2:-2] != key:
+                found.extend(_groups(table, title, key, periods, versions, person_ids))
+                key = row[2:-2]
+                periods = []
+                versions = {}
+            periods.append((row[0], row[-2], row[-1]))
+            versions[row[0]] = row[1]
+        found.extend(_groups(table, title, key, periods, versions, person_ids))
+    return found
+
+def _groups(table, title, key, periods, versions, person_ids):
+    if key is None or len(periods) < 2 or (person_ids is not None and key[0] not in person_ids):
+        return []
+    # Версії рядків потрібні merge(): період, змінений після перевірки, не буде видалено мовчки
+    return [
+        {"table": table, "title": title, "person_id": key[0], "preference_type": key[1] if len(key) > 1 else None,
+         "ids": ids, "versions": [versions[period_id] for period_id in ids], "start": start, "end": end}
+        for ids, start, end in sweep(periods)
+    ]
+
+def describe(overlap) -> str:
+    kind = overlap["title"]
+    if overlap["preference_type"]:
+        kind += f" ({overlap['preference_type']})"
+    return (f"{kind}: {len(overlap['ids'])} періоди перетинаються, разом "
+            f"{format_day(overlap['start'])} - {format_day(overlap['end'])}")
+
+def merge(db, overlaps):
+    # Кожна група періодів замінюється одним об'єднаним періодом; усе в одній транзакції.
+    # Якщо хоч один період змінили після перевірки - ConflictError, і не змінюється нічого.
+    with db.transaction():
+        for overlap in overlaps:
+            periods = zip(overlap["ids"], overlap["versions"])
+            if overlap["table"] == "service_periods":
+                db.delete_service_periods(periods)
+                db.add_service_period(overlap["person_id"], overlap["start"], overlap["end"])
+            else:
+                db.delete_preference_periods(periods)
+                db.add_preference_period(
+                    overlap["person_id"], overlap["start"], overlap["end"], overlap["preference_type"]
+                )
+    return {overlap["person_id"] for overlap in overlaps}
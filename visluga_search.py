@@ -0,0 +1,151 @@
+# Ця програма входить до проєкту Вислуга років
+# Відповідає за пошук людей: індекс префіксів і триграм у пам'яті та (для великих баз) FTS5 у SQLite
+
+import sqlite3
+from bisect import bisect_left
+
+FIELDS = ("sec_name", "name", "rank", "unit", "note")
+APOSTROPHES = str.maketrans({"’": "'", "ʼ": "'", "`": "'"})
+FTS_MIN_PEOPLE = 20000
+
+def normalize(text) -> str:
+    return (text or "").translate(APOSTROPHES).casefold().strip()
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SearchIndex:
+    # Слова з 1-2 літер шукаються як префікси слів, довші - як підрядки через триграми.
+    # Обидва індекси будуються ліниво, при першому запиті відповідного типу.
+    def __init__(self):
+        self.texts = {}
+        self.words = None
+        self.sorted_words = None
+        self.postings = None
+
+    def build(self, infos):
+        self.texts = {info.id: self.person_text(info) for info in infos}
+        self.words = None
+        self.sorted_words = None
+        self.postings = None
+
+    def person_text(self, info):
+        return normalize(" ".join(info.get(field) or "" for field in FIELDS))
+
+    def add(self, info):
+        self.remove(info.id)
+        person_id = info.id
+        text = self.texts[person_id] = self.person_text(info)
+        if self.words is not None:
+            for word in set(text.split()):
+                if word not in self.words:
+                    self.words[word] = []
+                    self.sorted_words = None
+                self.words[word].append(person_id)
+        if self.postings is not None:
+            for gram in trigrams(text):
+                self.postings.setdefault(gram, []).append(person_id)
+
+    def remove(self, person_id):
+        text = self.texts.pop(person_id, None)
+        if text is None:
+            return
+        if self.words is not None:
+            for word in set(text.split()):
+                self.words[word].remove(person_id)
+        if self.postings is not None:
+            for gram in trigrams(text):
+                self.postings[gram].remove(person_id)
+
+    def prefix_matches(self, word):
+        if self.words is None:
+            self.words = {}
+            for person_id, text in self.texts.items():
+                for token in set(text.split()):
+                    self.words.setdefault(token, []).append(person_id)
+        if self.sorted_words is None:
+            self.sorted_words = sorted(self.words)
+
+        found = set()
+        pos = bisect_left(self.sorted_words, word)
+        while pos < len(self.sorted_words) and self.sorted_words[pos].startswith(word):
+            found.update(self.words[self.sorted_words[pos]])
+            pos += 1
+        return found
+
+    def substring_matches(self, word):
+        if self.postings is None:
+            self.postings = {}
+            for person_id, text in self.texts.items():
+                for gram in trigrams(text):
+                    self.postings.setdefault(gram, []).append(person_id)
+
+        grams = sorted(trigrams(word), key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = set(self.postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(self.postings[gram])
+        return {person_id for person_id in candidates if word in self.texts[person_id]}
+
+    def search(self, query):
+        words = normalize(query).split()
+        if not words:
+            return None
+
+        found = None
+        for word in sorted(words, key=len, reverse=True):
+            matches = self.substring_matches(word) if len(word) >= 3 else self.prefix_matches(word)
+            found = matches if found is None else found & matches
+            if not found:
+                break
+        return found
+
+def _fts_text(row):
+    return (
+        f"replace(replace(coalesce({row}.sec_name, '') || ' ' || coalesce({row}.name, '') || ' ' || "
+        f"coalesce({row}.rank, '') || ' ' || coalesce({row}.unit, '') || ' ' || coalesce({row}.note, ''), "
+        "'’', ''''), 'ʼ', '''')"
+    )
+
+def enable_fts(conn) -> bool:
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'people_fts'").fetchone()
+    if exists:
+        return True
+
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("CREATE VIRTUAL TABLE people_fts USING fts5(search_text, tokenize='trigram')")
+        conn.execute(f"""
+            CREATE TRIGGER people_fts_insert AFTER INSERT ON people BEGIN
+                INSERT INTO people_fts (rowid, search_text) VALUES (new.id, {_fts_text("new")});
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER people_fts_delete AFTER DELETE ON people BEGIN
+                DELETE FROM people_fts WHERE rowid = old.id;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER people_fts_update AFTER UPDATE ON people BEGIN
+                UPDATE people_fts SET search_text = {_fts_text("new")} WHERE rowid = old.id;
+            END
+        """)
+        conn.execute(f"INSERT INTO people_fts (rowid, search_text) SELECT id, {_fts_text('people')} FROM people")
+        conn.execute("COMMIT")
+    except sqlite3.OperationalError as e:
+        # BEGIN IMMEDIATE міг і не початися (базу тримає інша копія програми) - тоді відкочувати нічого
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        print(f"FTS5 не ввімкнено, пошук працює в пам'яті: {e}")
+        return False
+    return True
+
+def fts_search(conn, query):
+    # None - запит неможливо виконати через FTS (порожній або є слова коротші за 3 літери)
+    words = normalize(query).split()
+    if not words or any(len(word) < 3 for word in words):
+        return None
+
+    match = " AND ".join('"' + word.replace('"', '""') + '"' for word in words)
+    return {row[0] for row in conn.execute("SELECT rowid FROM people_fts WHERE people_fts MATCH ?", (match,))}
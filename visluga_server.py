@@ -0,0 +1,375 @@
+# Ця програма входить до проєкту Вислуга років
+# Локальний сервер для кількох діловодів з однією базою: HTTP/JSON на asyncio, лише стандартна бібліотека.
+# Читання йдуть паралельно у пулі потоків, кожне зі свого з'єднання тільки для читання (знімок WAL).
+# Записи стають у одну чергу; єдиний потік-записувач забирає з неї все, що накопичилось,
+# і фіксує пачку однією транзакцією (кожен запит - окрема точка збереження, помилка одного не скасовує інших).
+# Без --token сервер слухає лише цей комп'ютер (127.0.0.1); для доступу з мережі потрібен спільний ключ,
+# який клієнт передає в адресі: http://ключ@сервер:8765
+# Запуск: python visluga_server.py <база.db> [--host 127.0.0.1] [--port 8765] [--token ключ]
+
+import argparse, asyncio, hmac, ipaddress, json, os, pathlib, sqlite3, threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from visluga_db import (
+    BUSY_TIMEOUT_MS, Database, ConflictError, ID_CHUNK, PERSON_COLUMNS, SQL_PERSON_CAL_ROWS, SQL_PERSON_PREF_ROWS, load_totals,
+    period_rows_for
+)
+
+DEFAULT_PORT = 8765
+READERS = 4
+# Найбільше запитів на запис в одній транзакції
+WRITE_BATCH = 200
+# Найбільше тіло запиту: з запасом на пакетне додавання періодів кільком тисячам людей
+MAX_BODY = 8 * 1024 * 1024
+TOKEN_HEADER = "x-visluga-token"
+REASONS = {
+    200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"
+}
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# Операції запису: назва -> (Database, аргументи з JSON) -> результат.
+# Зміни і видалення несуть прочитану версію рядка; невідповідність - відповідь 409 зі списком конфліктів.
+WRITE_OPS = {
+    "add_person": lambda db, args: db.add_person(args["info"]),
+    "update_person": lambda db, args: db.update_person(args["person_id"], args["info"], args["version"]),
+    "delete_people": lambda db, args: db.delete_people(args["people"]),
+    "add_service_periods": lambda db, args: db.add_service_periods(args["rows"]),
+    "add_preference_periods": lambda db, args: db.add_preference_periods(args["rows"]),
+    "update_service_period": lambda db, args: db.update_service_period(
+        args["period_id"], args["period"], args["version"]
+    ),
+    "update_preference_period": lambda db, args: db.update_preference_period(
+        args["period_id"], args["period"], args["version"]
+    ),
+    "delete_service_periods": lambda db, args: db.delete_service_periods(args["periods"]),
+    "delete_preference_periods": lambda db, args: db.delete_preference_periods(args["periods"]),
+}
+
+def _last_change(conn):
+    return conn.execute("SELECT coalesce(max(seq), 0) FROM change_journal").fetchone()[0]
+
+class VislugaServer:
+    def __init__(self, path, readers=READERS, batch=WRITE_BATCH, busy_timeout=BUSY_TIMEOUT_MS, token=None):
+        self.path = path
+        self.token = token
+        self.batch = batch
+        self.busy_timeout = busy_timeout
+        self.db = None
+        self.server = None
+        self.queue = None
+        self.writer_task = None
+        self.writes = 0
+        # Записувач - рівно один потік, і лише він тримає з'єднання для запису
+        self.writer_pool = ThreadPoolExecutor(max_workers=1)
+        self.reader_pool = ThreadPoolExecutor(max_workers=readers)
+        self.local = threading.local()
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.writer_pool, self.open_writer)
+        self.queue = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self.write_loop())
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.writer_pool, self.close_writer)
+        self.writer_pool.shutdown()
+        self.reader_pool.shutdown()
+
+    def open_writer(self):
+        from visluga_engine import recompute_totals
+
+        # Міграції, а також підсумки, що застаріли поки сервер не працював
+        self.db = Database(self.path, busy_timeout=self.busy_timeout)
+        recompute_totals(self.db, use_cache=True)
+
+    def close_writer(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # as_uri() екранує #, ? і пробіли у шляху - інакше SQLite обрізав би шлях разом із mode=ro
+            uri = pathlib.Path(self.path).resolve().as_uri() + "?mode=ro"
+            conn = self.local.conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+        return conn
+
+    # --- запис ---
+
+    async def write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self.writer_pool, self.apply_batch, [ops for ops, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def apply_batch(self, requests):
+        from visluga_engine import totals_with_cache
+
+        db = self.db
+        results = []
+        with db.transaction() as conn:
+            first = _last_change(conn)
+            for ops in requests:
+                conn.execute("SAVEPOINT request")
+                try:
+                    results.append([WRITE_OPS[name](db, args) for name, args in ops])
+                except ConflictError as e:
+                    conn.execute("ROLLBACK TO request")
+                    results.append(e)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO request")
+                    results.append(RequestError(400, f"{type(e).__name__}: {e}"))
+                conn.execute("RELEASE request")
+
+            # Підсумки змінених людей перераховуються в тій самій транзакції - читачі бачать їх разом зі змінами
+            changed = db.changed_people(first, _last_change(conn))
+            if changed:
+                cal_periods, pref_periods = db.periods_for(changed)
+                db.save_totals(totals_with_cache(changed, cal_periods, pref_periods, {})[1])
+            seq = _last_change(conn)
+        self.writes += len(requests)
+        return [result if isinstance(result, Exception) else {"results": result, "seq": seq} for result in results]
+
+    async def write(self, body):
+        ops = body.get("ops")
+        if not isinstance(ops, list) or not ops:
+            raise RequestError(400, "очікується непорожній список ops")
+        for op in ops:
+            if not isinstance(op, list) or len(op) != 2 or op[0] not in WRITE_OPS:
+                raise RequestError(400, f"невідома операція {op!r}")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((ops, future))
+        return await future
+
+    # --- читання ---
+
+    def read_people(self, person_ids=None):
+        conn = self.reader()
+        if person_ids is None:
+            return conn.execute(f"SELECT {PERSON_COLUMNS} FROM people").fetchall()
+        rows = []
+        for first in range(0, len(person_ids), ID_CHUNK):
+            chunk = person_ids[first:first + ID_CHUNK]
+            rows.extend(conn.execute(
+                f"SELECT {PERSON_COLUMNS} FROM people WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def read_service_periods(self):
+        return self.reader().execute("SELECT person_id, start_day, end_day FROM service_periods ORDER BY id").fetchall()
+
+    def read_preference_periods(self):
+        return self.reader().execute(
+            "SELECT person_id, start_day, end_day, preference_type FROM preferenced_periods ORDER BY id"
+        ).fetchall()
+
+    def read_periods(self, person_ids):
+        conn = self.reader()
+        # Обидві таблиці з одного знімка бази
+        conn.execute("BEGIN")
+        try:
+            cal, pref = period_rows_for(conn, person_ids)
+        finally:
+            conn.execute("COMMIT")
+        return {"cal": cal, "pref": pref}
+
+    def read_period_rows(self, person_id):
+        conn = self.reader()
+        return {
+            "cal": conn.execute(SQL_PERSON_CAL_ROWS, (person_id,)).fetchall(),
+            "pref": conn.execute(SQL_PERSON_PREF_ROWS, (person_id,)).fetchall(),
+        }
+
+    def read_totals(self):
+        return [[person_id, *row] for person_id, row in load_totals(self.reader()).items()]
+
+    def read_changes(self, since):
+        # Люди, змінені після номера журналу since: ті, що є, і видалені
+        conn = self.reader()
+        conn.execute("BEGIN")
+        try:
+            seq = _last_change(conn)
+            rows = conn.execute("""
+                SELECT j.person_id, p.id IS NOT NULL FROM change_journal j LEFT JOIN people p ON p.id = j.person_id
+                WHERE j.seq > ? AND j.seq <= ? GROUP BY j.person_id
+            """, (since, seq)).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return {
+            "seq": seq,
+            "changed": [person_id for person_id, exists in rows if exists],
+            "deleted": [person_id for person_id, exists in rows if not exists],
+        }
+
+    def read_status(self):
+        conn = self.reader()
+        return {
+            "path": self.path,
+            "people": conn.execute("SELECT count(*) FROM people").fetchone()[0],
+            "seq": _last_change(conn),
+            "writes": self.writes,
+        }
+
+    # --- HTTP ---
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        loop = asyncio.get_running_loop()
+
+        def read(func, *args):
+            return loop.run_in_executor(self.reader_pool, func, *args)
+
+        if method == "GET":
+            if path == "/status":
+                return await read(self.read_status)
+            if path == "/people":
+                return await read(self.read_people)
+            if path == "/service_periods":
+                return await read(self.read_service_periods)
+            if path == "/preference_periods":
+                return await read(self.read_preference_periods)
+            if path == "/totals":
+                return await read(self.read_totals)
+            if path == "/changes":
+                return await read(self.read_changes, int(query.get("since", ["0"])[0]))
+        elif method == "POST":
+            if path == "/write":
+                return await self.write(body)
+            if path == "/people":
+                return await read(self.read_people, [int(i) for i in body["person_ids"]])
+            if path == "/periods":
+                return await read(self.read_periods, [int(i) for i in body["person_ids"]])
+            if path == "/period_rows":
+                return await read(self.read_period_rows, int(body["person_id"]))
+        else:
+            raise RequestError(405, f"метод {method} не підтримується")
+        raise RequestError(404, f"невідомий шлях {path}")
+
+    def authorized(self, headers) -> bool:
+        if self.token is None:
+            return True
+        return hmac.compare_digest(headers.get(TOKEN_HEADER, "").encode("utf-8"), self.token.encode("utf-8"))
+
+    async def handle(self, reader, writer):
+        # HTTP/1.1 з повторним використанням з'єднання; тіло запиту і відповіді - JSON
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if not 0 <= length <= MAX_BODY:
+                    # Тіло не читається, тож з'єднання далі використовувати не можна
+                    await self.respond(writer, 413, {"error": f"тіло запиту більше {MAX_BODY} байт"})
+                    break
+                raw = await reader.readexactly(length)
+
+                try:
+                    if not self.authorized(headers):
+                        raise RequestError(401, "невірний ключ доступу")
+                    body = json.loads(raw) if raw else {}
+                    status, payload = 200, await self.dispatch(method, target, body)
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except ConflictError as e:
+                    status, payload = 409, {"error": str(e), "conflicts": e.conflicts}
+                except (ValueError, KeyError, TypeError) as e:
+                    status, payload = 400, {"error": f"{type(e).__name__}: {e}"}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                await self.respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # ValueError - зіпсований запит або задовгий рядок заголовка: з'єднання просто закривається
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+def is_loopback(host) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+async def serve(path, host, port, busy_timeout, token):
+    server = VislugaServer(path, busy_timeout=busy_timeout, token=token)
+    port = await server.start(host, port)
+    print(f"Сервер бази {path} працює на http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальний сервер 'Вислуги років' для кількох діловодів")
+    parser.add_argument("database")
+    parser.add_argument("--host", default="127.0.0.1", help="адреса, яку слухає сервер (інша, ніж 127.0.0.1, - лише з --token)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--busy-timeout", type=int, default=BUSY_TIMEOUT_MS,
+        help="скільки мс чекати, поки базу звільнить інша програма, що пише у файл напряму"
+    )
+    parser.add_argument(
+        "--token", default=os.environ.get("VISLUGA_TOKEN"),
+        help="спільний ключ доступу (або змінна середовища VISLUGA_TOKEN); клієнти вказують його як http://ключ@сервер:порт"
+    )
+    args = parser.parse_args()
+    if not args.token and not is_loopback(args.host):
+        # Без ключа будь-хто в мережі міг би читати і змінювати особові дані
+        parser.error("для доступу з мережі потрібен --token")
+    try:
+        asyncio.run(serve(args.database, args.host, args.port, args.busy_timeout, args.token or None))
+    except KeyboardInterrupt:
+        print("Сервер зупинено")
+
+if __name__ == "__main__":
+    main()